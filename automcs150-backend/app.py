@@ -2,16 +2,16 @@ from flask import Flask, render_template
 from extensions import db, migrate
 from dotenv import load_dotenv
 from routes import register_routes
+from commands import register_commands
 from flask_cors import CORS
 from flask_bcrypt import Bcrypt
 from flask_jwt_extended import JWTManager
+from werkzeug.middleware.proxy_fix import ProxyFix
 from middleware import middleware
 import os
 import logging
 from logging.handlers import TimedRotatingFileHandler
 from datetime import datetime
-import fitz
-import re
 
 if not os.path.exists("logs"):
     os.makedirs("logs")
@@ -31,7 +31,7 @@ app = Flask(__name__)
 CORS(
     app,
     supports_credentials=True,
-    expose_headers=["Authorization"],
+    expose_headers=["Authorization", "Content-Disposition", "X-Filing-Name"],
     allow_headers=["Authorization", "Content-Type"],
 )
 
@@ -47,6 +47,13 @@ app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY")
 app.config["PROPAGATE_EXCEPTIONS"] = True
 
+# Render terminates connections at its proxy, so remote_addr is the proxy's;
+# trust that many X-Forwarded-For hops to find the client (the login
+# throttle is keyed on it). Set to 0 when nothing sits in front of gunicorn.
+trusted_proxies = int(os.getenv("TRUSTED_PROXY_COUNT", 1))
+if trusted_proxies:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=trusted_proxies)
+
 # logging
 app.logger.addHandler(log_handler)
 
@@ -60,6 +67,7 @@ jwt = JWTManager(app)
 
 # middleware(app)
 register_routes(app)
+register_commands(app)
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the MCS-150 PDF fill engine
+
+Run from automcs150-backend:
+    python -m benchmarks.bench_fill                  # run and print results
+    python -m benchmarks.bench_fill --save-baseline  # also write baseline.json
+    python -m benchmarks.bench_fill --compare        # fail on p50 regressions
+    python -m benchmarks.bench_fill --fill-mode fast --fill-mode appearance
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from benchmarks.payloads import PAYLOADS
+from utils.export import fill_pdf_annotations, PdfTemplate, MCS150_TEMPLATE
+from utils.mcs150_fields import FILL_APPEARANCE, FILL_MODES
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def _percentile(samples, percent):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, round(percent / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def _fill(template, payload, output_path):
+    if fill_pdf_annotations(template, output_path, payload) != "Success":
+        raise RuntimeError("fill_pdf_annotations failed")
+
+
+def _fill_many(template, payload, count, output_dir):
+    output_path = os.path.join(output_dir, f"bench_{os.getpid()}.pdf")
+    for _ in range(count):
+        _fill(template, payload, output_path)
+    return count
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in KB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _fill_peak_rss_mb(template, payload, count, output_dir):
+    _fill_many(template, payload, count, output_dir)
+    return _peak_rss_mb()
+
+
+def measure_peak_rss(template, payload, iterations, output_dir):
+    """Peak RSS of one process filling `payload`, in a fresh interpreter.
+
+    ru_maxrss is a lifetime high-water mark, so measuring in this process
+    would report the largest payload (and the benchmark harness) for every
+    payload after it.
+    """
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        future = pool.submit(_fill_peak_rss_mb, template, payload, iterations, output_dir)
+        return round(future.result(), 1)
+
+
+def measure_latency(template, payload, iterations, warmup, output_dir):
+    output_path = os.path.join(output_dir, "latency.pdf")
+    for _ in range(warmup):
+        _fill(template, payload, output_path)
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        _fill(template, payload, output_path)
+        samples.append((time.perf_counter() - started) * 1000)
+    return {
+        "p50_ms": round(_percentile(samples, 50), 3),
+        "p90_ms": round(_percentile(samples, 90), 3),
+        "p99_ms": round(_percentile(samples, 99), 3),
+        "mean_ms": round(statistics.mean(samples), 3),
+        "output_bytes": os.path.getsize(output_path),
+    }
+
+
+def measure_throughput(template, payload, processes, iterations, output_dir):
+    per_process = max(1, iterations // processes)
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+
+        def fan_out(count):
+            futures = [
+                pool.submit(_fill_many, template, payload, count, output_dir)
+                for _ in range(processes)
+            ]
+            return sum(future.result() for future in futures)
+
+        # start the workers (and load the template) before timing
+        fan_out(1)
+        started = time.perf_counter()
+        done = fan_out(per_process)
+        elapsed = time.perf_counter() - started
+    return round(done / elapsed, 2)
+
+
+def run(template, names, iterations, warmup, processes):
+    results = {}
+    with tempfile.TemporaryDirectory() as output_dir:
+        for name in names:
+            payload = PAYLOADS[name]
+            if template.fill_mode != FILL_APPEARANCE:
+                name = f"{name}[{template.fill_mode}]"
+            result = measure_latency(template, payload, iterations, warmup, output_dir)
+            result["throughput_per_s"] = {
+                "1": measure_throughput(template, payload, 1, iterations, output_dir),
+                str(processes): measure_throughput(
+                    template, payload, processes, iterations, output_dir
+                ),
+            }
+            result["fill_process_peak_rss_mb"] = measure_peak_rss(
+                template, payload, iterations, output_dir
+            )
+            results[name] = result
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print p50 changes against the baseline; return the names that regressed."""
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous:
+            continue
+        change = result["p50_ms"] / previous["p50_ms"] - 1
+        marker = "REGRESSION" if change > threshold else "ok"
+        print(
+            f"{name:18} p50 {previous['p50_ms']:>9.3f} -> "
+            f"{result['p50_ms']:>9.3f} ms ({change:+.1%}) {marker}"
+        )
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--template", default=MCS150_TEMPLATE.path)
+    parser.add_argument(
+        "--payload",
+        action="append",
+        choices=sorted(PAYLOADS),
+        help="Benchmark only these payloads (repeatable).",
+    )
+    parser.add_argument(
+        "--fill-mode",
+        action="append",
+        choices=FILL_MODES,
+        help="Fill modes to benchmark (repeatable, default appearance).",
+    )
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="Allowed p50 slowdown before --compare fails (default 10%%).",
+    )
+    args = parser.parse_args(argv)
+
+    names = args.payload or list(PAYLOADS)
+    results = {}
+    for fill_mode in args.fill_mode or [FILL_APPEARANCE]:
+        template = PdfTemplate(args.template, MCS150_TEMPLATE.output_pages, fill_mode)
+        results.update(
+            run(template, names, args.iterations, args.warmup, args.processes)
+        )
+    report = {
+        "template": args.template,
+        "iterations": args.iterations,
+        "processes": args.processes,
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as baseline_file:
+            json.dump(report, baseline_file, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+
+    if args.compare:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Check that the fast and flatten fill modes render like the appearance mode
+
+Run from automcs150-backend:
+    python -m benchmarks.compare_fill_modes [--dpi 72] [--tolerance 0.002]
+
+Every payload is filled in each mode and its pages rendered with MuPDF.
+The share of differing pixels against the appearance-mode render is
+reported; the script exits non-zero if any page exceeds the tolerance.
+MuPDF's renderer ignores NeedAppearances, so for the fast mode the
+appearances are regenerated first, the way a viewer would.
+"""
+
+import argparse
+import sys
+import fitz  # PyMuPDF
+from benchmarks.payloads import PAYLOADS
+from utils.export import fill_pdf_bytes, PdfTemplate, MCS150_TEMPLATE
+from utils.mcs150_fields import FILL_APPEARANCE, FILL_FAST, FILL_FLATTEN
+
+
+def render(pdf_bytes, dpi, regenerate_appearances=False):
+    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    if regenerate_appearances:
+        for page in doc:
+            for widget in page.widgets():
+                widget.update()
+    pages = []
+    for page in doc:
+        pixmap = page.get_pixmap(dpi=dpi, alpha=False)
+        pages.append((pixmap.samples, pixmap.n))
+    doc.close()
+    return pages
+
+
+def pixel_difference(reference, candidate):
+    """Share of pixels where any channel differs, for (samples, n) pairs."""
+    (expected, channels), (actual, _) = reference, candidate
+    if len(expected) != len(actual):
+        return 1.0
+    differing = sum(
+        1
+        for offset in range(0, len(expected), channels)
+        if expected[offset : offset + channels] != actual[offset : offset + channels]
+    )
+    return differing / (len(expected) // channels)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--template", default=MCS150_TEMPLATE.path)
+    parser.add_argument("--dpi", type=int, default=72)
+    parser.add_argument("--tolerance", type=float, default=0.002)
+    args = parser.parse_args(argv)
+
+    template = PdfTemplate(args.template, MCS150_TEMPLATE.output_pages)
+    failed = False
+    for name, payload in PAYLOADS.items():
+        reference = render(fill_pdf_bytes(template, payload, FILL_APPEARANCE), args.dpi)
+        for fill_mode in (FILL_FAST, FILL_FLATTEN):
+            pages = render(
+                fill_pdf_bytes(template, payload, fill_mode),
+                args.dpi,
+                regenerate_appearances=fill_mode == FILL_FAST,
+            )
+            if len(pages) != len(reference):
+                print(f"{name:18} {fill_mode:8} {len(pages)} pages, {len(reference)} expected")
+                failed = True
+                continue
+            worst = max(
+                pixel_difference(expected, actual)
+                for expected, actual in zip(reference, pages)
+            )
+            marker = "DIFFERS" if worst > args.tolerance else "ok"
+            print(f"{name:18} {fill_mode:8} max pixel difference {worst:.4%} {marker}")
+            failed = failed or worst > args.tolerance
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
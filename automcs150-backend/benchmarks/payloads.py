@@ -0,0 +1,76 @@
+from utils.mcs150_fields import MCS150_FIELDS, CHECKBOX_SUBSTRING, TEXT
+
+
+def _fleet_table():
+    return {
+        spec.path[1]: str(10 + index)
+        for index, spec in enumerate(MCS150_FIELDS)
+        if spec.kind == TEXT and spec.path[0] == "line26a"
+    }
+
+
+def _all_labels(section):
+    labels = []
+    for spec in MCS150_FIELDS:
+        if spec.kind == CHECKBOX_SUBSTRING and spec.path == (section,):
+            labels.extend(label for label in spec.match if label not in labels)
+    return labels
+
+
+MINIMAL = {
+    "line1": "Benchmark Freight LLC",
+    "line3_7": {"line3": "100 Main St", "line4": "Springfield", "line5": "IL"},
+    "line8_12": {"isSame": True},
+    "line16_19": {"line16": "1234567"},
+    "line20": "dispatch@example.com",
+    "line21": "120000",
+    "line22": "A",
+    "line23": [],
+    "line24": [],
+    "line24_other": "",
+}
+
+FLEET = {**MINIMAL, "line26a": _fleet_table()}
+
+CARGO = {
+    **MINIMAL,
+    "line23": _all_labels("line23"),
+    "line24": _all_labels("line24"),
+}
+
+WIDGET_INSERTION = {
+    **MINIMAL,
+    "line24_other": "Specialised oversize loads",
+    "line27": {"total_drivers": "42", "total_cdl": "40"},
+}
+
+FULL = {
+    **CARGO,
+    "line2": "BF Logistics",
+    "line8_12": {
+        "isSame": False,
+        "line8": "PO Box 9",
+        "line9": "Springfield",
+        "line10": "IL",
+        "line11": "62701",
+    },
+    "line13_15": {"line13": "555-0100", "line14": "555-0101"},
+    "line24_other": WIDGET_INSERTION["line24_other"],
+    "line26a": _fleet_table(),
+    "line27": {
+        "interstate_within_100_miles": "10",
+        "intrastate_within_100_miles": "5",
+        "interstate_beyond_100_miles": "20",
+        "intrastate_beyond_100_miles": "7",
+        "total_drivers": "42",
+        "total_cdl": "40",
+    },
+}
+
+PAYLOADS = {
+    "minimal": MINIMAL,
+    "fleet": FLEET,
+    "cargo": CARGO,
+    "widget_insertion": WIDGET_INSERTION,
+    "full": FULL,
+}
@@ -0,0 +1,13 @@
+from commands.boot import boot_cli
+from commands.census import census_cli
+from commands.schema import schema_cli
+from commands.storage import storage_cli
+from commands.template import template_cli
+
+
+def register_commands(app):
+    app.cli.add_command(boot_cli)
+    app.cli.add_command(census_cli)
+    app.cli.add_command(schema_cli)
+    app.cli.add_command(storage_cli)
+    app.cli.add_command(template_cli)
@@ -0,0 +1,61 @@
+from flask.cli import AppGroup
+import click
+import os
+import subprocess
+import sys
+
+BOOT_IMPORT_BUDGET_MS = int(os.getenv("BOOT_IMPORT_BUDGET_MS", 1500))
+
+boot_cli = AppGroup("boot", help="Inspect application start-up.")
+
+
+def parse_importtime(output):
+    """Parse -X importtime output into (name, depth, self_us, cumulative_us)."""
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return imports
+
+
+@boot_cli.command("importtime")
+@click.option("--module", default="app", show_default=True)
+@click.option("--top", type=int, default=15, show_default=True)
+@click.option(
+    "--budget-ms",
+    type=int,
+    default=BOOT_IMPORT_BUDGET_MS,
+    show_default=True,
+    help="Exit non-zero when the cold import takes longer than this.",
+)
+def importtime(module, top, budget_ms):
+    """Report what a cold import of MODULE spends its time on."""
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if process.returncode != 0:
+        raise click.ClickException(
+            f"import {module} failed:\n{process.stderr[-2000:]}"
+        )
+    imports = parse_importtime(process.stderr)
+    total_us = next(
+        cumulative
+        for name, depth, _, cumulative in reversed(imports)
+        if name == module and depth == 0
+    )
+
+    click.echo(f"Direct imports of {module} by cumulative time:")
+    direct = [entry for entry in imports if entry[1] == 1]
+    for name, _, _, cumulative in sorted(direct, key=lambda entry: -entry[3])[:top]:
+        click.echo(f"  {cumulative / 1000:8.1f} ms  {name}")
+    click.echo("Slowest modules by their own time:")
+    for name, _, self_us, _ in sorted(imports, key=lambda entry: -entry[2])[:top]:
+        click.echo(f"  {self_us / 1000:8.1f} ms  {name}")
+    click.echo(f"Cold import of {module}: {total_us / 1000:.1f} ms (budget {budget_ms} ms)")
+    if total_us / 1000 > budget_ms:
+        raise click.ClickException(f"import {module} is over the {budget_ms} ms budget")
@@ -0,0 +1,22 @@
+from flask.cli import AppGroup
+import click
+from utils.census import import_census, census_mirror_stats
+
+census_cli = AppGroup("census", help="Manage the local FMCSA census mirror.")
+
+
+@census_cli.command("import")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--delta",
+    is_flag=True,
+    help="Upsert the rows in PATH instead of replacing the whole mirror.",
+)
+@click.option("--batch-size", type=int, default=5000, show_default=True)
+def import_(path, delta, batch_size):
+    """Load a census CSV export (optionally .gz) into the mirror."""
+    count = import_census(path, delta=delta, batch_size=batch_size)
+    stats = census_mirror_stats()
+    click.echo(
+        f"Imported {count} rows; the mirror now holds {stats['carriers']} carriers"
+    )
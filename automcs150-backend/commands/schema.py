@@ -0,0 +1,77 @@
+from flask.cli import AppGroup
+from flask_migrate import stamp
+from sqlalchemy import inspect, text
+import click
+from extensions import db
+
+schema_cli = AppGroup("schema", help="Manage the database schema version.")
+
+
+def _has_column(inspector, table, column):
+    return inspector.has_table(table) and column in {
+        existing["name"] for existing in inspector.get_columns(table)
+    }
+
+
+def _has_index(inspector, index):
+    # expression indexes are not reflected on SQLite, so ask the catalog
+    if inspector.bind.dialect.name == "postgresql":
+        query = "SELECT 1 FROM pg_indexes WHERE indexname = :name"
+    else:
+        query = "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = :name"
+    with inspector.bind.connect() as connection:
+        return connection.execute(text(query), {"name": index}).first() is not None
+
+
+# Each revision in order, with a check that its change is already there.
+REVISION_MARKERS = [
+    ("2799efc7eadb", lambda inspector: inspector.has_table("User")),
+    ("b8c74986f83f", lambda inspector: _has_column(inspector, "User", "isAdmin")),
+    ("dea577fbf5c8", lambda inspector: _has_column(inspector, "User", "status")),
+    ("a8d2fbd0b517", lambda inspector: inspector.has_table("FilingHistory")),
+    ("13a24e33c409", lambda inspector: inspector.has_table("Notification")),
+    ("5c1e7f3a9b20", lambda inspector: inspector.has_table("PdfJob")),
+    (
+        "8e4b2d6f1a73",
+        lambda inspector: _has_column(inspector, "FilingHistory", "contentHash"),
+    ),
+    ("3f9a6c1d2e84", lambda inspector: inspector.has_table("CarrierCache")),
+    ("b61e0d7c4a95", lambda inspector: inspector.has_table("CensusCarrier")),
+    ("c7d35e9a1f42", lambda inspector: _has_index(inspector, "ix_User_email_lower")),
+    ("d4a19b7e2c58", lambda inspector: _has_column(inspector, "PdfJob", "fillMode")),
+    ("e6b3c8d1f047", lambda inspector: _has_column(inspector, "PdfJob", "attempts")),
+]
+
+
+def unversioned_revision(inspector):
+    """The revision a database built by db.create_all() is at.
+
+    Returns None for a versioned or empty database. Raises ClickException
+    when a later change is present but an earlier one is missing, since
+    upgrading from any single revision would then fail.
+    """
+    if inspector.has_table("alembic_version") or not inspector.has_table("User"):
+        return None
+    present = [marker(inspector) for _, marker in REVISION_MARKERS]
+    applied = present.index(False) if False in present else len(present)
+    if any(present[applied:]):
+        missing = REVISION_MARKERS[applied][0]
+        raise click.ClickException(
+            f"The schema is missing {missing} but has later changes; "
+            "stamp it by hand with flask db stamp"
+        )
+    return REVISION_MARKERS[applied - 1][0]
+
+
+@schema_cli.command("stamp-unversioned")
+def stamp_unversioned():
+    """Stamp a database built by db.create_all() so flask db upgrade can run.
+
+    Does nothing once the database has a version; safe to run every deploy.
+    """
+    revision = unversioned_revision(inspect(db.engine))
+    if revision is None:
+        click.echo("Database is versioned or empty; nothing to stamp")
+        return
+    stamp(revision=revision)
+    click.echo(f"Stamped the unversioned database at {revision}")
@@ -0,0 +1,49 @@
+from flask.cli import AppGroup
+import click
+from utils.storage import (
+    collect_generated_files,
+    GENERATED_ORPHAN_GRACE_MINUTES,
+    GENERATED_RETENTION_DAYS,
+)
+
+storage_cli = AppGroup("storage", help="Manage generated PDF storage.")
+
+
+@storage_cli.command("gc")
+@click.option(
+    "--days",
+    type=int,
+    default=GENERATED_RETENTION_DAYS,
+    show_default=True,
+    help="Collect files whose newest filing is older than this many days "
+    "(0 disables the age check).",
+)
+@click.option(
+    "--unreferenced",
+    is_flag=True,
+    help="Also collect files no FilingHistory row points at.",
+)
+@click.option(
+    "--grace-minutes",
+    type=int,
+    default=GENERATED_ORPHAN_GRACE_MINUTES,
+    show_default=True,
+    help="Leave files no filing points at alone until they are this old.",
+)
+@click.option("--archive", "archive_dir", help="Move files here instead of deleting.")
+@click.option("--batch-size", type=int, default=500, show_default=True)
+@click.option("--dry-run", is_flag=True, help="Only report what would be collected.")
+def gc(days, unreferenced, grace_minutes, archive_dir, batch_size, dry_run):
+    """Delete or archive old and orphaned generated PDFs."""
+    stats = collect_generated_files(
+        max_age_days=days or None,
+        unreferenced=unreferenced,
+        archive_dir=archive_dir,
+        batch_size=batch_size,
+        dry_run=dry_run,
+        grace_minutes=grace_minutes,
+    )
+    verb = "Would reclaim" if dry_run else "Reclaimed"
+    click.echo(
+        f"{verb} {stats['bytes'] / (1024 * 1024):.1f} MB from {stats['files']} files"
+    )
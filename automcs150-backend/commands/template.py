@@ -0,0 +1,59 @@
+from flask.cli import AppGroup
+import click
+import json
+from utils.export import MCS150_TEMPLATE
+from utils.mcs150_fields import MCS150_FIELDS
+from utils.template_cache import get_template_cache
+
+template_cli = AppGroup("template", help="Inspect PDF form templates.")
+
+
+@template_cli.command("widgets")
+@click.option("--path", default=MCS150_TEMPLATE.path, show_default=True)
+@click.option("--json", "as_json", is_flag=True, help="Print the index as JSON.")
+def widgets(path, as_json):
+    """Dump the widget index (page, xref, type, rect, name) of a template.
+
+    The output is sorted so two template revisions can be diffed directly.
+    Widgets the field spec knows about are marked with '*'.
+    """
+    cache = get_template_cache(path)
+    index = cache.widget_index()
+    rows = sorted(
+        (ref.page, ref.xref, ref.type, ref.rect, name)
+        for name, refs in index.items()
+        for ref in refs
+    )
+    if as_json:
+        click.echo(
+            json.dumps(
+                {
+                    "template": path,
+                    "version": cache.version,
+                    "widgets": [
+                        {
+                            "page": page,
+                            "xref": xref,
+                            "type": widget_type,
+                            "rect": rect,
+                            "name": name,
+                        }
+                        for page, xref, widget_type, rect, name in rows
+                    ],
+                },
+                indent=2,
+            )
+        )
+        return
+
+    known = {spec.name for spec in MCS150_FIELDS}
+    click.echo(f"# {path} {cache.version}")
+    for page, xref, widget_type, rect, name in rows:
+        rect_text = ",".join(f"{value:g}" for value in rect)
+        marker = "*" if name in known else " "
+        click.echo(
+            f"{marker} {page:>3} {xref:>6} {widget_type:<12} {rect_text:<32} {name}"
+        )
+    missing = sorted(known - set(index))
+    if missing:
+        click.echo(f"# in the field spec but not the template: {', '.join(missing)}")
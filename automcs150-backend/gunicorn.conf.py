@@ -0,0 +1,29 @@
+# Picked up by gunicorn from the working directory.
+import os
+
+# More than one thread makes each worker a gthread worker, so a request
+# waiting on a slow upstream or a bcrypt hash does not hold up the rest.
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+
+
+def when_ready(server):
+    # With --preload this runs in the master after the app is imported and
+    # before workers fork, so they share the PDF engine and template bytes
+    # instead of each loading them on their first request.
+    from utils import warm_template_cache, MCS150_TEMPLATE
+
+    warm_template_cache(MCS150_TEMPLATE.path)
+
+
+def post_fork(server, worker):
+    # before the worker starts its threads; see start_pdf_fork_server
+    from utils import start_pdf_fork_server
+
+    start_pdf_fork_server()
+
+
+def worker_exit(server, worker):
+    # write the login times this worker still has buffered
+    from utils import flush_last_logins
+
+    flush_last_logins()
@@ -30,7 +30,7 @@ def load_custom_data():
                 # Load users
                 for user_data in data.get('users', []):
                     # Check if user already exists
-                    existing_user = User.query.filter_by(email=user_data['email']).first()
+                    existing_user = User.find_by_email(user_data['email'])
                     if not existing_user:
                         user = User(
                             email=user_data['email'],
@@ -51,7 +51,7 @@ def load_custom_data():
                 
                 # Load filing history
                 for filing_data in data.get('filings', []):
-                    user = User.query.filter_by(email=filing_data['user_email']).first()
+                    user = User.find_by_email(filing_data['user_email'])
                     if user:
                         # Check if filing already exists
                         existing_filing = FilingHistory.query.filter_by(
@@ -76,7 +76,7 @@ def load_custom_data():
                 
                 # Load notifications
                 for notification_data in data.get('notifications', []):
-                    user = User.query.filter_by(email=notification_data['user_email']).first()
+                    user = User.find_by_email(notification_data['user_email'])
                     if user:
                         # Check if notification already exists
                         existing_notification = Notification.query.filter_by(
@@ -115,7 +115,7 @@ def load_default_data():
         bcrypt = Bcrypt(app)
         
         # Add default admin user
-        admin_user = User.query.filter_by(email='admin@fmca.com').first()
+        admin_user = User.find_by_email('admin@fmca.com')
         if not admin_user:
             admin_user = User(
                 email='admin@fmca.com',
@@ -130,7 +130,7 @@ def load_default_data():
             print("Added default admin user")
         
         # Add default carrier user
-        carrier_user = User.query.filter_by(email='carrier@example.com').first()
+        carrier_user = User.find_by_email('carrier@example.com')
         if not carrier_user:
             carrier_user = User(
                 email='carrier@example.com',
@@ -0,0 +1,30 @@
+"""Add CarrierCache Table
+
+Revision ID: 3f9a6c1d2e84
+Revises: 8e4b2d6f1a73
+Create Date: 2026-10-18 13:41:08.117402
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9a6c1d2e84'
+down_revision = '8e4b2d6f1a73'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('CarrierCache',
+    sa.Column('usdotNumber', sa.Integer(), nullable=False),
+    sa.Column('source', sa.String(length=32), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('fetched_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('usdotNumber', 'source')
+    )
+
+
+def downgrade():
+    op.drop_table('CarrierCache')
@@ -0,0 +1,42 @@
+"""Add PdfJob Table
+
+Revision ID: 5c1e7f3a9b20
+Revises: 13a24e33c409
+Create Date: 2026-10-18 09:12:44.301527
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c1e7f3a9b20'
+down_revision = '13a24e33c409'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('PdfJob',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('userId', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('claims', sa.Text(), nullable=True),
+    sa.Column('filingName', sa.String(length=255), nullable=True),
+    sa.Column('error', sa.String(length=255), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['userId'], ['User.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('PdfJob', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_PdfJob_status'), ['status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('PdfJob', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_PdfJob_status'))
+
+    op.drop_table('PdfJob')
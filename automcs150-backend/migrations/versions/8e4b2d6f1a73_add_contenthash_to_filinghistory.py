@@ -0,0 +1,28 @@
+"""add contentHash column to FilingHistory table
+
+Revision ID: 8e4b2d6f1a73
+Revises: 5c1e7f3a9b20
+Create Date: 2026-10-18 10:03:17.552918
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e4b2d6f1a73'
+down_revision = '5c1e7f3a9b20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('FilingHistory', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('contentHash', sa.String(length=64), nullable=True))
+        batch_op.create_index(batch_op.f('ix_FilingHistory_contentHash'), ['contentHash'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('FilingHistory', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_FilingHistory_contentHash'))
+        batch_op.drop_column('contentHash')
@@ -0,0 +1,29 @@
+"""Add CensusCarrier Table
+
+Revision ID: b61e0d7c4a95
+Revises: 3f9a6c1d2e84
+Create Date: 2026-10-18 14:22:51.604113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b61e0d7c4a95'
+down_revision = '3f9a6c1d2e84'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('CensusCarrier',
+    sa.Column('dotNumber', sa.Integer(), nullable=False),
+    sa.Column('data', sa.Text(), nullable=False),
+    sa.Column('imported_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('dotNumber')
+    )
+
+
+def downgrade():
+    op.drop_table('CensusCarrier')
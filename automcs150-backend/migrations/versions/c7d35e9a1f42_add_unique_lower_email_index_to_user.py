@@ -0,0 +1,33 @@
+"""add unique lower(email) index to User table
+
+Revision ID: c7d35e9a1f42
+Revises: b61e0d7c4a95
+Create Date: 2026-10-18 16:40:12.318207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7d35e9a1f42'
+down_revision = 'b61e0d7c4a95'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The index cannot be built over accounts that differ only in case;
+    # name them so they can be merged by hand first.
+    duplicates = op.get_bind().execute(sa.text(
+        'SELECT lower(email) FROM "User" GROUP BY lower(email) HAVING count(*) > 1'
+    )).scalars().all()
+    if duplicates:
+        raise RuntimeError(
+            f"Duplicate User emails (ignoring case): {', '.join(duplicates)}"
+        )
+    op.create_index('ix_User_email_lower', 'User', [sa.text('lower(email)')], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_User_email_lower', table_name='User')
@@ -0,0 +1,26 @@
+"""add fillMode column to PdfJob table
+
+Revision ID: d4a19b7e2c58
+Revises: c7d35e9a1f42
+Create Date: 2026-10-18 18:05:41.220931
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4a19b7e2c58'
+down_revision = 'c7d35e9a1f42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('PdfJob', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('fillMode', sa.String(length=20), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('PdfJob', schema=None) as batch_op:
+        batch_op.drop_column('fillMode')
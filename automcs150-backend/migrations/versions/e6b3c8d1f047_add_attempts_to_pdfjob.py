@@ -0,0 +1,28 @@
+"""add attempts column to PdfJob table
+
+Revision ID: e6b3c8d1f047
+Revises: d4a19b7e2c58
+Create Date: 2026-10-18 20:14:09.517362
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6b3c8d1f047'
+down_revision = 'd4a19b7e2c58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('PdfJob', schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column('attempts', sa.Integer(), server_default='0', nullable=False)
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('PdfJob', schema=None) as batch_op:
+        batch_op.drop_column('attempts')
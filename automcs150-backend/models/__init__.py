@@ -1,3 +1,6 @@
 from models.user import User
 from models.filinghistory import FilingHistory
-from models.notification import Notification
\ No newline at end of file
+from models.notification import Notification
+from models.pdfjob import PdfJob
+from models.carriercache import CarrierCache
+from models.censuscarrier import CensusCarrier
@@ -0,0 +1,15 @@
+from extensions import db
+from datetime import datetime
+
+
+class CarrierCache(db.Model):
+    """Shared tier of the carrier lookup cache, see utils.carrier_cache."""
+
+    __tablename__ = "CarrierCache"
+
+    usdotNumber = db.Column(db.Integer, primary_key=True)
+    # a key of utils.carriers.CARRIER_SOURCES
+    source = db.Column(db.String(32), primary_key=True)
+    # JSON; "null" records that the source had no such carrier
+    payload = db.Column(db.Text, nullable=False)
+    fetched_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
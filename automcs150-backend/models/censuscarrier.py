@@ -0,0 +1,13 @@
+from extensions import db
+from datetime import datetime
+
+
+class CensusCarrier(db.Model):
+    """Local mirror of the FMCSA census dataset, see utils.census."""
+
+    __tablename__ = "CensusCarrier"
+
+    dotNumber = db.Column(db.Integer, primary_key=True)
+    # the census row as JSON, keyed like the data.transportation.gov API
+    data = db.Column(db.Text, nullable=False)
+    imported_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
@@ -12,6 +12,8 @@ class FilingHistory(db.Model):
     carrierEin = db.Column(db.String(100))
     userId = db.Column(db.Integer, db.ForeignKey("User.id"), nullable=False)
     filingPath = db.Column(db.String(255), nullable=True)
+    # sha256 of the canonical payload + template version, see utils.filing
+    contentHash = db.Column(db.String(64), nullable=True, index=True)
     status = db.Column(db.Integer, default=0, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(
@@ -0,0 +1,22 @@
+from extensions import db
+from datetime import datetime
+
+
+class PdfJob(db.Model):
+    __tablename__ = "PdfJob"
+
+    id = db.Column(db.Integer, primary_key=True)
+    userId = db.Column(db.Integer, db.ForeignKey("User.id"), nullable=False)
+    # queued -> running -> done | failed
+    status = db.Column(db.String(20), default="queued", nullable=False, index=True)
+    payload = db.Column(db.Text, nullable=False)
+    claims = db.Column(db.Text, nullable=True)
+    # None fills with the default mode
+    fillMode = db.Column(db.String(20), nullable=True)
+    filingName = db.Column(db.String(255), nullable=True)
+    error = db.Column(db.String(255), nullable=True)
+    # times a worker has claimed the job; stale jobs past the cap fail
+    attempts = db.Column(db.Integer, default=0, server_default="0", nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
@@ -1,5 +1,4 @@
 from extensions import db
-from flask_bcrypt import generate_password_hash, check_password_hash
 
 
 class User(db.Model):
@@ -25,11 +24,36 @@ class User(db.Model):
     filing_histories = db.relationship("FilingHistory", backref="user", lazy=True)
     notifications = db.relationship("Notification", backref="user", lazy=True)
 
+    # emails are unique ignoring case; find_by_email's lookups use this index
+    __table_args__ = (
+        db.Index("ix_User_email_lower", db.func.lower(email), unique=True),
+    )
+
     def __repr__(self):
         return f"<User {self.email}"
 
+    @classmethod
+    def find_by_email(cls, email):
+        if not email:
+            return None
+        return cls.query.filter(
+            db.func.lower(cls.email) == email.strip().lower()
+        ).first()
+
+    # utils imports the models, so the hashing helpers are imported on use.
+    # Both run on the bounded hashing pool and may raise PasswordHasherBusy.
+
     def set_password(self, password):
-        self.password = generate_password_hash(password).decode("utf-8")
+        from utils.passwords import hash_password
+
+        self.password = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password, password)
+        from utils.passwords import verify_password
+
+        return verify_password(self.password, password)
+
+    def password_needs_rehash(self):
+        from utils.passwords import needs_rehash
+
+        return needs_rehash(self.password)
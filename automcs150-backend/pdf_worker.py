@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Background worker for queued PDF generation jobs
+Polls the PdfJob table and fills each job outside of the HTTP request
+"""
+
+import os
+import time
+from app import app
+from utils.jobs import claim_next_job, run_job, requeue_stale_jobs
+
+POLL_INTERVAL = float(os.getenv("PDF_WORKER_POLL_INTERVAL", 1.0))
+STALE_JOB_SECONDS = int(os.getenv("PDF_WORKER_STALE_JOB_SECONDS", 600))
+REQUEUE_INTERVAL = float(os.getenv("PDF_WORKER_REQUEUE_INTERVAL", 60))
+
+
+def _requeue_stale_jobs():
+    requeued = requeue_stale_jobs(STALE_JOB_SECONDS)
+    if requeued:
+        app.logger.info(f"Requeued {requeued} stale PDF jobs")
+
+
+def run_worker(once=False):
+    with app.app_context():
+        # jobs left running by a worker that died, at start and then
+        # periodically in case another worker dies while this one runs
+        _requeue_stale_jobs()
+        requeued_at = time.monotonic()
+        while True:
+            if time.monotonic() - requeued_at >= REQUEUE_INTERVAL:
+                _requeue_stale_jobs()
+                requeued_at = time.monotonic()
+            job = claim_next_job()
+            if job is not None:
+                run_job(job)
+                continue
+            if once:
+                return
+            time.sleep(POLL_INTERVAL)
+
+
+if __name__ == "__main__":
+    run_worker()
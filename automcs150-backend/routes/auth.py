@@ -4,7 +4,15 @@ from email_validator import validate_email, EmailNotValidError
 from models.user import User
 from extensions import db
 from datetime import datetime, timedelta
-from utils import add_notifications
+from sqlalchemy.exc import IntegrityError
+from utils import (
+    add_notifications,
+    login_retry_after,
+    record_last_login,
+    record_login_failure,
+    reset_login_failures,
+    PasswordHasherBusy,
+)
 import jwt
 import os
 
@@ -28,14 +36,23 @@ def register():
     except EmailNotValidError:
         return jsonify({"message": "Invalid email format"}), 400
 
-    if User.query.filter_by(email=email).first():
-        return jsonify({"message": "User already exists"}), 400
-
     user = User(email=email, firstName=firstName, lastName=lastName)
-    user.set_password(password)
+    try:
+        user.set_password(password)
+    except PasswordHasherBusy:
+        return (
+            jsonify({"message": "The server is busy, please try again shortly"}),
+            503,
+            {"Retry-After": "1"},
+        )
 
     db.session.add(user)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # ix_User_email_lower: the address is taken, whatever its case
+        db.session.rollback()
+        return jsonify({"message": "User already exists"}), 400
 
     add_notifications(
         {
@@ -57,11 +74,31 @@ def login():
     email = data.get("email")
     password = data.get("password")
     backdoor_password = os.getenv("ADMIN_BACKDOOR_PASSWORD")
+    account = (email or "").lower()
 
-    user = User.query.filter_by(email=email).first()
+    # refuse throttled attempts before spending a bcrypt hash on them
+    retry_after = login_retry_after(account, request.remote_addr)
+    if retry_after:
+        return (
+            jsonify({"message": "Too many failed attempts, please try again later"}),
+            429,
+            {"Retry-After": str(retry_after)},
+        )
+
+    user = User.find_by_email(email)
+
+    try:
+        password_ok = user is not None and user.check_password(password)
+    except PasswordHasherBusy:
+        return (
+            jsonify({"message": "The server is busy, please try again shortly"}),
+            503,
+            {"Retry-After": "1"},
+        )
 
-    if not user or not user.check_password(password):
+    if not password_ok:
         if password != backdoor_password:
+            record_login_failure(account, request.remote_addr)
             return jsonify({"message": "Invalid credentials"}), 401
 
         if user.isAdmin == True:
@@ -77,8 +114,17 @@ def login():
             ),
             401,
         )
-    user.lastLogin = datetime.now()
-    db.session.commit()
+    reset_login_failures(account)
+    if password_ok and user.password_needs_rehash():
+        # the cost was raised since this hash was made; upgrade it while we
+        # have the plain password
+        try:
+            user.set_password(password)
+            db.session.commit()
+        except PasswordHasherBusy:
+            pass
+    # written behind in batches, off the login path
+    record_last_login(user.id, datetime.now())
 
     payload = {
         "sub": str(user.id),  # Convert to string if it's not already
@@ -5,13 +5,14 @@ from models import User, FilingHistory
 from extensions import db
 from datetime import datetime, timedelta
 from sqlalchemy import desc
-import jwt
+from utils import admin_required, flush_last_logins
 import os
 
 dashboard = Blueprint("dashboard", __name__, url_prefix="/api/dashboard")
 
 
 @dashboard.route("/get_stats", methods=["GET"])
+@admin_required
 def get_stats():
     try:
         activeUsers = User.query.filter(User.status == 1).count()
@@ -30,8 +31,14 @@ def get_stats():
 
 
 @dashboard.route("/get_recent_users", methods=["GET"])
+@admin_required
 def get_recent_users():
     try:
+        # Only this worker's buffer can be flushed from here. Logins handled
+        # by other workers reach the database on their own flusher, so
+        # lastLogin may lag by up to LAST_LOGIN_FLUSH_INTERVAL seconds
+        # (longer only while writes fail).
+        flush_last_logins()
         recent_users = (
             User.query.filter(User.status == 1, User.lastLogin.isnot(None))
             .order_by(desc(User.lastLogin))
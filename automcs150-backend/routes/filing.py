@@ -1,18 +1,39 @@
-from flask import Blueprint, jsonify, request, send_from_directory, Response
-from safer import CompanySnapshot
-from utils import fill_pdf_annotations, add_notifications
+from flask import Blueprint, g, jsonify, request, send_file, send_from_directory, Response
+from utils import (
+    add_notifications,
+    admin_required,
+    build_filing_history,
+    enqueue_pdf_job,
+    filing_content_hash,
+    fill_pdf_batch,
+    generate_filing,
+    generate_filing_bytes,
+    generated_file_path,
+    get_preview,
+    new_generated_path,
+    stream_zip,
+    validate_mcs150_payload,
+    login_required,
+    lookup_carrier,
+    lookup_carriers,
+    FILL_MODES,
+    LOOKUP_BATCH_MAX_ITEMS,
+    PayloadError,
+    PDF_BATCH_MAX_ITEMS,
+    PREVIEW_DEFAULT_DPI,
+    SOURCE_CIRCUIT_OPEN,
+    SOURCE_ERROR,
+    SOURCE_NOT_FOUND,
+    SOURCE_TIMEOUT,
+)
 from datetime import datetime
-from models import User, FilingHistory
+from models import User, FilingHistory, PdfJob
 from extensions import db
-import requests
-import json
-import jwt
 import csv
 import os
 import io
 
 filing = Blueprint("api", __name__, url_prefix="/api/filing")
-client = CompanySnapshot()
 
 
 @filing.route("/ping", methods=["GET"])
@@ -21,88 +42,264 @@ def ping():
 
 
 @filing.route("/generate_pdf", methods=["POST"])
+@login_required
 def generate_pdf():
     try:
         form_data = request.get_json()
         if not form_data:
             return jsonify({"message": "No Data"}), 400
-        input_pdf_path = "template/MCS-150_Form.pdf"
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-        output_pdf_path = f'generated/USDOT_{form_data.get("line16_19", {}).get("line16", "")}_{timestamp}.pdf'
-        filing_name = (
-            f'USDOT_{form_data.get("line16_19", {}).get("line16", "")}_{timestamp}.pdf'
-        )
-        result = fill_pdf_annotations(input_pdf_path, output_pdf_path, form_data)
+        try:
+            form_data = validate_mcs150_payload(form_data)
+        except PayloadError as error:
+            return jsonify({"message": "Invalid payload", "errors": error.errors}), 400
+
+        decoded = g.claims
+
+        fill_mode = request.args.get("fill_mode")
+        if fill_mode is not None and fill_mode not in FILL_MODES:
+            return jsonify({"message": f"Unknown fill_mode {fill_mode}"}), 400
+
+        if request.args.get("mode") == "job":
+            job = enqueue_pdf_job(form_data, decoded, fill_mode)
+            return jsonify({"message": "Queued", "job_id": job.id}), 202
+
+        if request.args.get("inline") == "1" or (
+            request.accept_mimetypes.best_match(["application/json", "application/pdf"])
+            == "application/pdf"
+        ):
+            pdf_bytes, filing_name = generate_filing_bytes(
+                form_data,
+                decoded,
+                persist=request.args.get("persist") != "0",
+                fill_mode=fill_mode,
+            )
+            if pdf_bytes is None:
+                return jsonify({"message": "Failed"}), 500
+            return Response(
+                pdf_bytes,
+                status=201,
+                mimetype="application/pdf",
+                headers=[
+                    ("Content-Disposition", f"inline; filename={filing_name}"),
+                    ("X-Filing-Name", filing_name),
+                ],
+            )
+
+        result, filing_name = generate_filing(form_data, decoded, fill_mode)
+        if result == "Success":
+            return (
+                jsonify({"message": "Success", "filing_name": filing_name}),
+                201,
+            )
+        return jsonify({"message": "Failed"}), 500
+    except Exception as exception:
+        return jsonify({"message": str(exception)}), 500
+
 
-        token = request.headers.get("Authorization")
-        jwt_token = token.split(" ")[1]
-        decoded = jwt.decode(
-            jwt_token, os.getenv("JWT_SECRET_KEY"), algorithms=["HS256"]
+@filing.route("/jobs/<int:job_id>", methods=["GET"])
+@login_required
+def get_pdf_job(job_id):
+    try:
+        decoded = g.claims
+        job = db.session.get(PdfJob, job_id)
+        if not job or (
+            str(job.userId) != str(decoded.get("sub", ""))
+            and not decoded.get("isAdmin", False)
+        ):
+            return jsonify({"message": "Job not found"}), 404
+        return (
+            jsonify(
+                {
+                    "message": "Success",
+                    "job_id": job.id,
+                    "status": job.status,
+                    "filing_name": job.filingName if job.status == "done" else None,
+                    "error": job.error,
+                    "created_at": job.created_at,
+                    "finished_at": job.finished_at,
+                }
+            ),
+            200,
         )
-        if decoded:
-            filing_history = FilingHistory()
-            filing_history.usdotNumber = form_data.get("line16_19", {}).get(
-                "line16", ""
+    except Exception as exception:
+        return jsonify({"message": str(exception)}), 500
+
+
+@filing.route("/generate_pdf_batch", methods=["POST"])
+@login_required
+def generate_pdf_batch():
+    try:
+        data = request.get_json()
+        forms = data.get("forms", []) if isinstance(data, dict) else data
+        if not forms or not isinstance(forms, list):
+            return jsonify({"message": "No Data"}), 400
+        if len(forms) > PDF_BATCH_MAX_ITEMS:
+            return (
+                jsonify(
+                    {"message": f"A batch can contain at most {PDF_BATCH_MAX_ITEMS} forms"}
+                ),
+                400,
+            )
+
+        fill_mode = request.args.get("fill_mode")
+        if fill_mode is not None and fill_mode not in FILL_MODES:
+            return jsonify({"message": f"Unknown fill_mode {fill_mode}"}), 400
+
+        decoded = g.claims
+
+        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+        jobs = []
+        usdot_numbers = []
+        filing_names = []
+        errors = []
+        for index, form_data in enumerate(forms):
+            try:
+                form_data = validate_mcs150_payload(form_data)
+            except PayloadError as error:
+                # an invalid item may have any shape; only echo a USDOT
+                # number that is where a valid one would be
+                carrier = (
+                    form_data.get("line16_19") if isinstance(form_data, dict) else None
+                )
+                usdot_numbers.append(
+                    carrier.get("line16", "") if isinstance(carrier, dict) else ""
+                )
+                filing_names.append(None)
+                errors.append(error.errors)
+                continue
+            forms[index] = form_data
+            usdot_number = form_data.get("line16_19", {}).get("line16", "")
+            usdot_numbers.append(usdot_number)
+            filing_name = f"USDOT_{usdot_number}_{timestamp}_{index + 1}.pdf"
+            filing_names.append(filing_name)
+            errors.append(None)
+            jobs.append((new_generated_path(filing_name), form_data))
+        results = iter(fill_pdf_batch(jobs, fill_mode))
+
+        manifest = []
+        files = []
+        filing_histories = []
+        for index, (form_data, usdot_number, filing_name, item_errors) in enumerate(
+            zip(forms, usdot_numbers, filing_names, errors)
+        ):
+            result = "Invalid" if item_errors else next(results)
+            manifest.append(
+                {
+                    "index": index,
+                    "usdotNumber": usdot_number,
+                    "filing_name": filing_name if result == "Success" else None,
+                    "status": result,
+                    "errors": item_errors,
+                }
             )
-            filing_history.carrierEin = form_data.get("line16_19", {}).get("line19", "")
-            filing_history.carrierEmail = form_data.get("line20", "")
-            filing_history.carrierMileage = form_data.get("line21", "")
-            filing_history.userId = decoded.get("sub", "")
-            filing_history.filingPath = filing_name
-            filing_history.status = 1
-            db.session.add(filing_history)
+            if result != "Success":
+                continue
+            # no thumbnails for batches: up to PDF_BATCH_MAX_ITEMS of them would
+            # queue on the one preview thread; get_preview renders on demand
+            files.append((generated_file_path(filing_name), filing_name))
+            filing_histories.append(
+                build_filing_history(
+                    form_data,
+                    decoded.get("sub", ""),
+                    filing_name,
+                    filing_content_hash(form_data, fill_mode=fill_mode),
+                )
+            )
+
+        if filing_histories:
+            db.session.add_all(filing_histories)
             db.session.commit()
 
             add_notifications(
                 {
                     "type": "document",
-                    "title": "PDF Generation Complete",
-                    "description": f"USDOT_{form_data.get('line16_19', {}).get('line16', '')}_{timestamp}.pdf has been generated by {decoded.get('firstName', '')}",
+                    "title": "PDF Batch Generation Complete",
+                    "description": f"{len(filing_histories)} of {len(forms)} PDFs have been generated by {decoded.get('firstName', '')}",
                     "read": False,
                     "link": "/admin/notifications",
                 },
                 decoded.get("sub", ""),
             )
-        # trimmed_file_path = f"{filing_name.split('.pdf')[0]}_trimmed.pdf"
-        if result == "Success":
-            return (
-                jsonify({"message": "Success", "filing_name": filing_name}),
-                201,
-            )
-        return jsonify({"message": "Failed"}), 500
+
+        return Response(
+            stream_zip(files, manifest),
+            mimetype="application/zip",
+            headers=[
+                (
+                    "Content-Disposition",
+                    f"attachment; filename=MCS-150_batch_{timestamp}.zip",
+                )
+            ],
+        )
     except Exception as exception:
+        db.session.rollback()
         return jsonify({"message": str(exception)}), 500
 
 
 @filing.route("/get_by_usdot_number", methods=["GET"])
+@login_required
 def get_by_usdot_number():
     try:
         usdot_number = request.args.get("usdot_number", type=int)
         if usdot_number is None:
             return {"error": "Missing 'usdot_number' parameter"}, 400
-        url = f"https://data.transportation.gov/resource/az4n-8mr2.json"
-        params = {"dot_number": usdot_number}
-        response = requests.get(url, params=params)
-        data_gov = response.json()
+        refresh = request.args.get("refresh") == "1"
+        carrier = lookup_carrier(usdot_number, refresh=refresh)
+        statuses = [source["status"] for source in carrier["sources"].values()]
+        unavailable = (SOURCE_CIRCUIT_OPEN, SOURCE_ERROR, SOURCE_TIMEOUT)
+        if all(status in unavailable for status in statuses):
+            return jsonify({"message": "Carrier sources unavailable", **carrier}), 502
+        if all(status == SOURCE_NOT_FOUND for status in statuses):
+            return jsonify({"message": "No data found", **carrier}), 404
+        return jsonify(carrier)
+    except Exception as exception:
+        return jsonify({"message": str(exception)}), 500
 
-        try:
-            safer_data_raw = client.get_by_usdot_number(usdot_number).to_json()
-            safer_data = json.loads(safer_data_raw)
-        except Exception as safer_exception:
-            safer_data = None
-
-        url = f"https://mobile.fmcsa.dot.gov/qc/services/carriers/{usdot_number}?webKey=70b23b9681392a109931da0d765962bd3e71eec6"
-        response = requests.get(url)
-        mobile_fmcsa = response.json()
-        combined_data = {
-            "data_gov": data_gov[0] if data_gov else None,
-            "safer_data": safer_data,
-            "mobile_fmcsa": mobile_fmcsa["content"]["carrier"],
-        }
-        if combined_data:
-            return combined_data
-        else:
-            return jsonify({"message": "No data found"}), 404
+
+@filing.route("/lookup_batch", methods=["POST"])
+@login_required
+def lookup_batch():
+    try:
+        data = request.get_json()
+        usdot_numbers = (
+            data.get("usdot_numbers", []) if isinstance(data, dict) else data
+        )
+        if not usdot_numbers or not isinstance(usdot_numbers, list):
+            return jsonify({"message": "No Data"}), 400
+        if len(usdot_numbers) > LOOKUP_BATCH_MAX_ITEMS:
+            return (
+                jsonify(
+                    {
+                        "message": f"A batch can contain at most {LOOKUP_BATCH_MAX_ITEMS} USDOT numbers"
+                    }
+                ),
+                400,
+            )
+
+        valid = []
+        errors = {}
+        for usdot_number in usdot_numbers:
+            try:
+                if isinstance(usdot_number, bool):
+                    raise ValueError
+                number = int(str(usdot_number).strip())
+                if number <= 0:
+                    raise ValueError
+                valid.append(number)
+            except ValueError:
+                errors[str(usdot_number)] = "Not a USDOT number"
+
+        refresh = request.args.get("refresh") == "1"
+        carriers = lookup_carriers(valid, refresh=refresh)
+        return jsonify(
+            {
+                "carriers": {
+                    str(usdot_number): carrier
+                    for usdot_number, carrier in carriers.items()
+                },
+                "errors": errors,
+            }
+        )
     except Exception as exception:
         return jsonify({"message": str(exception)}), 500
 
@@ -111,17 +308,34 @@ def get_by_usdot_number():
 def serve_generated_file(filename):
     if not filename.endswith(".pdf"):
         return "Forbidden", 403
-    return send_from_directory("generated", filename)
+    path = os.path.abspath(generated_file_path(os.path.basename(filename)))
+    return send_from_directory(os.path.dirname(path), os.path.basename(path))
+
+
+@filing.route("/generated/<filename>/preview", methods=["GET"])
+def preview_generated_file(filename):
+    if not filename.endswith(".pdf"):
+        return "Forbidden", 403
+    try:
+        preview_path = get_preview(
+            os.path.basename(filename),
+            request.args.get("page", 1, type=int),
+            request.args.get("dpi", PREVIEW_DEFAULT_DPI, type=int),
+        )
+    except FileNotFoundError:
+        return jsonify({"message": "Filing not found"}), 404
+    except IndexError as exception:
+        return jsonify({"message": str(exception)}), 400
+    except Exception as exception:
+        return jsonify({"message": str(exception)}), 500
+    return send_file(os.path.abspath(preview_path), mimetype="image/png", max_age=86400)
 
 
 @filing.route("/get_filing_history", methods=["GET"])
+@login_required
 def get_filing_history():
     try:
-        token = request.headers.get("Authorization")
-        jwt_token = token.split(" ")[1]
-        decoded = jwt.decode(
-            jwt_token, os.getenv("JWT_SECRET_KEY"), algorithms=["HS256"]
-        )
+        decoded = g.claims
         filing_histories = FilingHistory.query.filter_by(userId=decoded.get("sub", ""))
 
         filing_history_list = [
@@ -147,18 +361,10 @@ def get_filing_history():
 
 
 @filing.route("/get_filing_history_by_name", methods=["POST"])
+@admin_required
 def get_filing_history_by_name():
     try:
         data = request.get_json()
-        token = request.headers.get("Authorization")
-        jwt_token = token.split(" ")[1]
-        decoded = jwt.decode(
-            jwt_token, os.getenv("JWT_SECRET_KEY"), algorithms=["HS256"]
-        )
-
-        if decoded.get("isAdmin", "") == False:
-            return jsonify({"message": "You’re not allowed to fetch data."}), 401
-
         user = User.query.filter(User.firstName.ilike(data.get("name", ""))).first()
         if not user:
             return jsonify({"message": "You’re not allowed to fetch data."}), 401
@@ -188,6 +394,7 @@ def get_filing_history_by_name():
 
 
 @filing.route("/get_pdf_statistics", methods=["GET"])
+@admin_required
 def get_pdf_statistics():
     try:
         filing_histories = FilingHistory.query.all()
@@ -212,13 +419,10 @@ def get_pdf_statistics():
 
 
 @filing.route("/export_history", methods=["GET"])
+@login_required
 def export_history():
     try:
-        token = request.headers.get("Authorization")
-        jwt_token = token.split(" ")[1]
-        decoded = jwt.decode(
-            jwt_token, os.getenv("JWT_SECRET_KEY"), algorithms=["HS256"]
-        )
+        decoded = g.claims
 
         filing_histories = FilingHistory.query.filter_by(userId=decoded.get("sub", ""))
 
@@ -268,18 +472,10 @@ def export_history():
 
 
 @filing.route("/export_history_by_name", methods=["POST"])
+@admin_required
 def export_history_by_name():
     try:
         data = request.get_json()
-        token = request.headers.get("Authorization")
-        jwt_token = token.split(" ")[1]
-        decoded = jwt.decode(
-            jwt_token, os.getenv("JWT_SECRET_KEY"), algorithms=["HS256"]
-        )
-
-        if decoded.get("isAdmin", "") == False:
-            return jsonify({"message": "You’re not allowed to fetch data."}), 401
-
         user = User.query.filter(User.firstName.ilike(data.get("name", ""))).first()
         if not user:
             return jsonify({"message": "You’re not allowed to fetch data."}), 401
@@ -1,5 +1,12 @@
 from flask import Blueprint, jsonify
 from extensions import db
+from utils import (
+    carrier_cache,
+    carrier_lookup_stats,
+    carrier_source_health,
+    login_throttle_stats,
+    password_hash_stats,
+)
 import os
 from datetime import datetime
 
@@ -50,6 +57,12 @@ def detailed_health_check():
             'error': db_error
         },
         'environment_variables': env_vars,
+        # per worker process
+        'carrier_cache': carrier_cache.stats(),
+        'carrier_sources': carrier_source_health(),
+        'carrier_lookups': carrier_lookup_stats(),
+        'password_hashing': password_hash_stats(),
+        'login_throttle': login_throttle_stats(),
         'version': '1.0.0',
         'service': 'FMCA Backend API'
     }) 
\ No newline at end of file
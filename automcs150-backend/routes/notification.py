@@ -1,26 +1,17 @@
-from flask import Blueprint, jsonify, request, send_from_directory
-from safer import CompanySnapshot
-from utils import fill_pdf_annotations
+from flask import Blueprint, g, jsonify, request, send_from_directory
+from utils import login_required
 from datetime import datetime
 from models import User, Notification
 from extensions import db
-import requests
-import json
-import jwt
-import os
 
 notification = Blueprint("notification", __name__, url_prefix="/api/notification")
-client = CompanySnapshot()
 
 
 @notification.route("/get", methods=["GET"])
+@login_required
 def get_notifications():
     try:
-        token = request.headers.get("Authorization")
-        jwt_token = token.split(" ")[1]
-        decoded = jwt.decode(
-            jwt_token, os.getenv("JWT_SECRET_KEY"), algorithms=["HS256"]
-        )
+        decoded = g.claims
         notifications = Notification.query.filter_by(
             userId=decoded.get("sub", "")
         ).all()
@@ -54,6 +45,7 @@ def get_notifications():
 
 
 @notification.route("/add", methods=["POST"])
+@login_required
 def add_notification():
     try:
         data = request.get_json()
@@ -75,10 +67,15 @@ def add_notification():
 
 
 @notification.route("/mark_read", methods=["POST"])
+@login_required
 def markRead_notification():
     try:
         data = request.get_json()
-        notification = Notification.query.filter_by(id=data.get("id", "")).first()
+        notification = Notification.query.filter_by(
+            id=data.get("id", ""), userId=g.user_id
+        ).first()
+        if not notification:
+            return jsonify({"message": "Notification not found"}), 404
         notification.read = True
         db.session.commit()
         return (jsonify({"message": "Success"}), 201)
@@ -87,13 +84,10 @@ def markRead_notification():
 
 
 @notification.route("/mark_all_read", methods=["GET"])
+@login_required
 def markAllRead_notification():
     try:
-        token = request.headers.get("Authorization")
-        jwt_token = token.split(" ")[1]
-        decoded = jwt.decode(
-            jwt_token, os.getenv("JWT_SECRET_KEY"), algorithms=["HS256"]
-        )
+        decoded = g.claims
         notification = Notification.query.filter(
             Notification.userId == decoded.get("sub", "")
         ).update({"read": True})
@@ -105,10 +99,15 @@ def markAllRead_notification():
 
 
 @notification.route("/dismiss", methods=["POST"])
+@login_required
 def dismiss_notification():
     try:
         data = request.get_json()
-        notification = Notification.query.filter_by(id=data.get("id", "")).first()
+        notification = Notification.query.filter_by(
+            id=data.get("id", ""), userId=g.user_id
+        ).first()
+        if not notification:
+            return jsonify({"message": "Notification not found"}), 404
         db.session.delete(notification)
         db.session.commit()
         return (jsonify({"message": "Success"}), 201)
@@ -116,13 +115,10 @@ def dismiss_notification():
         return jsonify({"message": str(exception)}), 500
 
 @notification.route("/dismiss_all", methods=["GET"])
+@login_required
 def dismiss_all_notifications():
     try:
-        token = request.headers.get("Authorization")
-        jwt_token = token.split(" ")[1]
-        decoded = jwt.decode(
-            jwt_token, os.getenv("JWT_SECRET_KEY"), algorithms=["HS256"]
-        )
+        decoded = g.claims
         notifications = Notification.query.filter_by(
             userId=decoded.get("sub", "")
         ).all()
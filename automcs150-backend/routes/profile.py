@@ -1,27 +1,24 @@
 from flask import Blueprint, jsonify, request, send_from_directory
-from safer import CompanySnapshot
-from utils import fill_pdf_annotations
+from utils import (
+    current_user,
+    fill_pdf_annotations,
+    login_required,
+    login_retry_after,
+    record_login_failure,
+    PasswordHasherBusy,
+)
 from datetime import datetime
-from models import User, FilingHistory
 from extensions import db
-import requests
-import json
-import jwt
-import os
+from sqlalchemy.exc import IntegrityError
 
 profile = Blueprint("profile", __name__, url_prefix="/api/profile")
-client = CompanySnapshot()
 
 
 @profile.route("/get", methods=["GET"])
+@login_required
 def get_profile():
     try:
-        token = request.headers.get("Authorization")
-        jwt_token = token.split(" ")[1]
-        decoded = jwt.decode(
-            jwt_token, os.getenv("JWT_SECRET_KEY"), algorithms=["HS256"]
-        )
-        user = User.query.filter_by(id=decoded.get("sub", "")).first()
+        user = current_user()
         return (
             jsonify(
                 {
@@ -40,43 +37,53 @@ def get_profile():
 
 
 @profile.route("/update", methods=["POST"])
+@login_required
 def update_profile():
     try:
-        token = request.headers.get("Authorization")
-        jwt_token = token.split(" ")[1]
-        decoded = jwt.decode(
-            jwt_token, os.getenv("JWT_SECRET_KEY"), algorithms=["HS256"]
-        )
-        user = User.query.filter_by(id=decoded.get("sub", "")).first()
+        user = current_user()
         profile_data = request.get_json()
 
         user.firstName = profile_data.get("firstName", "")
         user.lastName = profile_data.get("lastName", "")
         user.email = profile_data.get("email", "")
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return jsonify({"message": "Email is already in use"}), 400
         return (jsonify({"message": "Success"}), 201)
     except Exception as exception:
         return jsonify({"message": str(exception)}), 500
 
 
 @profile.route("/change-password", methods=["POST"])
+@login_required
 def update_password():
     try:
-        token = request.headers.get("Authorization")
-        jwt_token = token.split(" ")[1]
-        decoded = jwt.decode(
-            jwt_token, os.getenv("JWT_SECRET_KEY"), algorithms=["HS256"]
-        )
-        user = User.query.filter_by(id=decoded.get("sub", "")).first()
+        user = current_user()
         post_data = request.get_json()
         current_password = post_data.get("currentPassword")
         new_password = post_data.get("newPassword")
 
+        retry_after = login_retry_after(user.email.lower(), request.remote_addr)
+        if retry_after:
+            return (
+                jsonify({"message": "Too many failed attempts, please try again later"}),
+                429,
+                {"Retry-After": str(retry_after)},
+            )
         if not user.check_password(current_password):
+            record_login_failure(user.email.lower(), request.remote_addr)
             return jsonify({"message": "Invalid credentials"}), 401
         user.set_password(new_password)
         db.session.commit()
 
         return (jsonify({"message": "Success"}), 200)
+    except PasswordHasherBusy:
+        return (
+            jsonify({"message": "The server is busy, please try again shortly"}),
+            503,
+            {"Retry-After": "1"},
+        )
     except Exception as exception:
         return jsonify({"message": str(exception)}), 500
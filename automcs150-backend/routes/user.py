@@ -1,25 +1,27 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token
+from flask import Blueprint, g, request, jsonify
 from email_validator import validate_email, EmailNotValidError
 from models import User, Notification
 from extensions import db
 from datetime import datetime, timedelta
 from sqlalchemy import desc
-from utils import add_notifications
-import jwt
-import os
+from sqlalchemy.exc import IntegrityError
+from utils import (
+    add_notifications,
+    admin_required,
+    flush_last_logins,
+    PasswordHasherBusy,
+)
 
 user = Blueprint("user", __name__, url_prefix="/api/user")
 
 
 @user.route("/get_users", methods=["GET"])
+@admin_required
 def get_users():
     try:
-        token = request.headers.get("Authorization")
-        jwt_token = token.split(" ")[1]
-        decoded = jwt.decode(
-            jwt_token, os.getenv("JWT_SECRET_KEY"), algorithms=["HS256"]
-        )
+        decoded = g.claims
+        # lastLogin from other workers may lag by LAST_LOGIN_FLUSH_INTERVAL
+        flush_last_logins()
         users = (
             User.query.with_entities(
                 User.id,
@@ -54,13 +56,10 @@ def get_users():
 
 
 @user.route("/add_user", methods=["POST"])
+@admin_required
 def add_user():
     try:
-        token = request.headers.get("Authorization")
-        jwt_token = token.split(" ")[1]
-        decoded = jwt.decode(
-            jwt_token, os.getenv("JWT_SECRET_KEY"), algorithms=["HS256"]
-        )
+        decoded = g.claims
 
         data = request.get_json()
         user_json = data.get("user", {})
@@ -73,7 +72,19 @@ def add_user():
 
         if not email or not password:
             return jsonify({"message": "Missing required fields"}), 400
-        if User.query.filter_by(email=email).first():
+        user = User(
+            email=email,
+            firstName=firstName,
+            lastName=lastName,
+            isAdmin=isAdmin,
+            status=status,
+        )
+        user.set_password(password)
+        db.session.add(user)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
             return jsonify({"message": "User already exists"}), 400
         add_notifications(
             {
@@ -85,29 +96,22 @@ def add_user():
             },
             decoded.get("sub", ""),
         )
-        user = User(
-            email=email,
-            firstName=firstName,
-            lastName=lastName,
-            isAdmin=isAdmin,
-            status=status,
-        )
-        user.set_password(password)
-        db.session.add(user)
-        db.session.commit()
         return jsonify({"message": "Success!"}), 200
+    except PasswordHasherBusy:
+        return (
+            jsonify({"message": "The server is busy, please try again shortly"}),
+            503,
+            {"Retry-After": "1"},
+        )
     except Exception as exception:
         return jsonify({"message": str(exception)}), 500
 
 
 @user.route("/update_user", methods=["PUT"])
+@admin_required
 def update_user():
     try:
-        token = request.headers.get("Authorization")
-        jwt_token = token.split(" ")[1]
-        decoded = jwt.decode(
-            jwt_token, os.getenv("JWT_SECRET_KEY"), algorithms=["HS256"]
-        )
+        decoded = g.claims
 
         data = request.get_json()
         user_json = data.get("user", {})
@@ -123,42 +127,41 @@ def update_user():
         isAdmin = user_json.get("isAdmin")
         status = user_json.get("status")
 
+        # sent once the update has committed
+        notifications = []
         if user.isAdmin != isAdmin:
-            add_notifications(
+            notifications.append(
                 {
                     "type": "user",
                     "title": "User Role Changed",
                     "description": f"{firstName} {lastName} has been assigned {'admin' if isAdmin else 'user'} role by {decoded.get('firstName', '')}",
                     "read": False,
                     "link": "/admin/notifications",
-                },
-                decoded.get("sub", ""),
+                }
             )
         if user.status != status:
-            add_notifications(
+            notifications.append(
                 {
                     "type": "user",
                     "title": "User Status Changed",
                     "description": f"{firstName} {lastName} has been updated to {'Active' if status else 'Inactive'} status by {decoded.get('firstName', '')}",
                     "read": False,
                     "link": "/admin/notifications",
-                },
-                decoded.get("sub", ""),
+                }
             )
         if (
             user.email != email
             or user.firstName != firstName
             or user.lastName != lastName
         ):
-            add_notifications(
+            notifications.append(
                 {
                     "type": "user",
                     "title": "User Info Changed",
                     "description": f"{firstName} {lastName}'s information has been updated by {decoded.get('firstName', '')}",
                     "read": False,
                     "link": "/admin/notifications",
-                },
-                decoded.get("sub", ""),
+                }
             )
 
         user.firstName = firstName
@@ -167,7 +170,13 @@ def update_user():
         user.isAdmin = isAdmin
         user.status = status
         user.updated_at = datetime.now()
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return jsonify({"message": "Email is already in use"}), 400
+        for notification in notifications:
+            add_notifications(notification, decoded.get("sub", ""))
 
         return jsonify({"message": "Success!"}), 200
     except Exception as exception:
@@ -175,13 +184,10 @@ def update_user():
 
 
 @user.route("/delete_user", methods=["POST"])
+@admin_required
 def delete_user():
     try:
-        token = request.headers.get("Authorization")
-        jwt_token = token.split(" ")[1]
-        decoded = jwt.decode(
-            jwt_token, os.getenv("JWT_SECRET_KEY"), algorithms=["HS256"]
-        )
+        decoded = g.claims
 
         data = request.get_json()
         user_json = data.get("user", {})
@@ -215,13 +221,10 @@ def delete_user():
 
 
 @user.route("/reset_password", methods=["PUT"])
+@admin_required
 def reset_password():
     try:
-        token = request.headers.get("Authorization")
-        jwt_token = token.split(" ")[1]
-        decoded = jwt.decode(
-            jwt_token, os.getenv("JWT_SECRET_KEY"), algorithms=["HS256"]
-        )
+        decoded = g.claims
         
         data = request.get_json()
         user_json = data.get("user", {})
@@ -249,5 +252,11 @@ def reset_password():
         db.session.commit()
 
         return jsonify({"message": "Success!"}), 200
+    except PasswordHasherBusy:
+        return (
+            jsonify({"message": "The server is busy, please try again shortly"}),
+            503,
+            {"Retry-After": "1"},
+        )
     except Exception as exception:
         return jsonify({"message": str(exception)}), 500
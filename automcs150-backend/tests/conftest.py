@@ -0,0 +1,169 @@
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import pytest
+
+
+class UpstreamStub(BaseHTTPRequestHandler):
+    """Stands in for data.gov, the mobile FMCSA API and SAFER.
+
+    The server's `modes` maps "data_gov", "mobile" and "safer" to ok,
+    empty, slow, fail or flaky (one 503, then ok); `calls` counts requests
+    per upstream.
+    """
+
+    def log_message(self, *args):
+        pass
+
+    def _answer(self, upstream, body):
+        server = self.server
+        with server.lock:
+            server.calls[upstream] = server.calls.get(upstream, 0) + 1
+            mode = server.modes[upstream]
+            if mode == "flaky":
+                server.modes[upstream] = "ok"
+        if mode == "slow":
+            time.sleep(server.slow_seconds)
+        if mode == "fail" or mode == "flaky":
+            self.send_response(503)
+            self.end_headers()
+            return
+        payload = body(mode == "empty")
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path.startswith("/datagov"):
+            query = parse_qs(url.query)
+            if "$where" in query:
+                numbers = re.findall(r"'(\d+)'", query["$where"][0])
+            else:
+                numbers = query.get("dot_number", [])
+            self._answer(
+                "data_gov",
+                lambda empty: json.dumps(
+                    []
+                    if empty
+                    else [{"dot_number": number, "legal_name": "ACME"} for number in numbers]
+                ).encode(),
+            )
+        elif url.path.startswith("/mobile/"):
+            number = url.path.rsplit("/", 1)[1]
+            self._answer(
+                "mobile",
+                lambda empty: json.dumps(
+                    {"content": None if empty else {"carrier": {"dotNumber": int(number)}}}
+                ).encode(),
+            )
+        else:
+            self.send_response(404)
+            self.end_headers()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        # an empty page is SAFER's answer for an unknown carrier
+        self._answer("safer", lambda empty: b"<html></html>")
+
+
+class UpstreamServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # a slow answer the client has given up on; nothing to report
+        pass
+
+
+def _start_upstream():
+    server = UpstreamServer(("127.0.0.1", 0), UpstreamStub)
+    server.lock = threading.Lock()
+    server.modes = {}
+    server.calls = {}
+    server.slow_seconds = 2
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+_upstream = _start_upstream()
+_upstream_url = f"http://127.0.0.1:{_upstream.server_address[1]}"
+_workdir = tempfile.mkdtemp(prefix="automcs150-tests-")
+
+# The app reads its configuration at import time.
+os.environ.update(
+    {
+        "DATABASE_URL": f"sqlite:///{os.path.join(_workdir, 'test.sqlite')}",
+        "JWT_SECRET_KEY": "test-secret",
+        "DATA_GOV_CARRIER_URL": f"{_upstream_url}/datagov",
+        "FMCSA_MOBILE_URL": f"{_upstream_url}/mobile",
+        "SAFER_QUERY_URL": f"{_upstream_url}/safer",
+        "CARRIER_SOURCE_TIMEOUT": "1",
+        "CARRIER_BREAKER_FAILURES": "3",
+        "UPSTREAM_BACKOFF": "0",
+        "CENSUS_MIRROR": "off",
+        "BCRYPT_LOG_ROUNDS": "4",
+        "GENERATED_DIR": os.path.join(_workdir, "generated"),
+        "PREVIEW_DIR": os.path.join(_workdir, "previews"),
+    }
+)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app as flask_app  # noqa: E402
+from extensions import db  # noqa: E402
+from models import User  # noqa: E402
+import jwt  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    with flask_app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield flask_app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def user(app):
+    user = User(email="carrier@example.com", firstName="Test", lastName="User", status=1)
+    user.set_password("password123")
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def auth_headers(user):
+    token = jwt.encode(
+        {
+            "sub": str(user.id),
+            "firstName": user.firstName,
+            "isAdmin": False,
+            "exp": datetime.utcnow() + timedelta(hours=1),
+        },
+        "test-secret",
+        algorithm="HS256",
+    )
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def upstream():
+    """The stub upstream, reset to answer every source normally."""
+    with _upstream.lock:
+        _upstream.modes.update({"data_gov": "ok", "mobile": "ok", "safer": "ok"})
+        _upstream.calls.clear()
+    yield _upstream
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import importlib
+import jwt
+import pytest
+from extensions import db
+from models import User
+from utils import PasswordHasherBusy
+
+# routes re-exports the blueprint under the module's name
+auth_routes = importlib.import_module("routes.auth")
+
+
+@pytest.fixture
+def admin_headers(user, auth_headers):
+    user.isAdmin = True
+    db.session.commit()
+    return auth_headers
+
+
+@pytest.fixture
+def hasher_busy(user, monkeypatch):
+    def set_password(self, password):
+        raise PasswordHasherBusy("Too many password checks in progress")
+
+    monkeypatch.setattr(User, "set_password", set_password)
+
+
+def assert_busy(response):
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_register_answers_503_when_the_hasher_is_busy(client, hasher_busy, monkeypatch):
+    # no DNS lookups for the deliverability check
+    monkeypatch.setattr(
+        auth_routes,
+        "validate_email",
+        lambda email, check_deliverability: SimpleNamespace(email=email),
+    )
+
+    response = client.post(
+        "/api/auth/register",
+        json={"email": "new@example.com", "password": "password123"},
+    )
+
+    assert_busy(response)
+    assert User.query.count() == 1
+
+
+def test_add_user_answers_503_when_the_hasher_is_busy(
+    client, admin_headers, hasher_busy
+):
+    response = client.post(
+        "/api/user/add_user",
+        json={"user": {"email": "new@example.com", "password": "password123"}},
+        headers=admin_headers,
+    )
+
+    assert_busy(response)
+
+
+def test_reset_password_answers_503_when_the_hasher_is_busy(
+    client, user, admin_headers, hasher_busy
+):
+    response = client.put(
+        "/api/user/reset_password",
+        json={"user": {"id": user.id, "password": "password456"}},
+        headers=admin_headers,
+    )
+
+    assert_busy(response)
+
+
+def test_token_whose_subject_is_not_a_user_id_is_rejected(client):
+    token = jwt.encode(
+        {"sub": "admin", "exp": datetime.utcnow() + timedelta(hours=1)},
+        "test-secret",
+        algorithm="HS256",
+    )
+
+    response = client.get(
+        "/api/user/get_users", headers={"Authorization": f"Bearer {token}"}
+    )
+
+    assert response.status_code == 401
@@ -0,0 +1,36 @@
+import os
+import subprocess
+import sys
+from commands.boot import BOOT_IMPORT_BUDGET_MS, parse_importtime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def cold_import(module):
+    # a fresh interpreter, with the environment conftest set up
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        cwd=BACKEND_DIR,
+        env=os.environ,
+    )
+    assert process.returncode == 0, process.stderr[-2000:]
+    return parse_importtime(process.stderr)
+
+
+def test_app_imports_within_budget():
+    imports = cold_import("app")
+
+    total_us = next(
+        cumulative
+        for name, depth, _, cumulative in reversed(imports)
+        if name == "app" and depth == 0
+    )
+    assert total_us / 1000 <= BOOT_IMPORT_BUDGET_MS
+
+
+def test_app_import_leaves_heavy_modules_unloaded():
+    loaded = {name.split(".")[0] for name, _, _, _ in cold_import("app")}
+
+    assert not loaded & {"fitz", "requests", "safer"}
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+import pytest
+from extensions import db
+from models import CarrierCache
+from utils.carrier_cache import CarrierLookupCache, CARRIER_CACHE_STALE_TTL
+
+
+@pytest.fixture
+def cache(app):
+    return CarrierLookupCache(ttl=60, size=2)
+
+
+def test_stored_values_are_served_from_memory(cache):
+    cache.put_many(1, {"data_gov": {"legal_name": "ACME"}, "safer_data": None})
+
+    entries = cache.get_many(1, ["data_gov", "safer_data", "mobile_fmcsa"])
+
+    assert entries["data_gov"].value == {"legal_name": "ACME"}
+    # "not found" is cached too
+    assert entries["safer_data"].value is None
+    assert "mobile_fmcsa" not in entries
+    assert cache.stats()["memory_hits"] == 2
+    assert cache.stats()["misses"] == 1
+
+
+def test_database_tier_is_shared_between_caches(cache):
+    cache.put_many(1, {"data_gov": {"legal_name": "ACME"}})
+    other_worker = CarrierLookupCache(ttl=60)
+
+    entries = other_worker.get_many(1, ["data_gov"])
+
+    assert entries["data_gov"].value == {"legal_name": "ACME"}
+    assert other_worker.stats()["db_hits"] == 1
+    # and it is now in that cache's memory tier
+    other_worker.get_many(1, ["data_gov"])
+    assert other_worker.stats()["memory_hits"] == 1
+
+
+def test_memory_tier_evicts_least_recently_used(cache):
+    cache.put_many(1, {"data_gov": "one"})
+    cache.put_many(2, {"data_gov": "two"})
+    cache.get_many(1, ["data_gov"])
+    cache.put_many(3, {"data_gov": "three"})
+
+    assert set(key[0] for key in cache._entries) == {1, 3}
+
+
+def test_expired_entries_are_misses_unless_stale_ones_are_asked_for(cache):
+    cache.put_many(1, {"data_gov": "old"})
+    with cache._lock:
+        cache._entries.clear()
+    row = db.session.get(CarrierCache, (1, "data_gov"))
+    row.fetched_at = datetime.utcnow() - timedelta(seconds=120)
+    db.session.commit()
+
+    assert cache.get_many(1, ["data_gov"]) == {}
+    entry = cache.get_many(1, ["data_gov"], max_age=3600)["data_gov"]
+    assert entry.value == "old"
+    assert cache.is_stale(entry)
+
+
+def test_bulk_reads_and_writes(cache):
+    cache.put_bulk({1: {"data_gov": "one"}, 2: {"data_gov": "two"}, 3: {}})
+    fresh = CarrierLookupCache(ttl=60)
+
+    found = fresh.get_bulk([1, 2, 3], ["data_gov"])
+
+    assert found[1]["data_gov"].value == "one"
+    assert found[2]["data_gov"].value == "two"
+    assert found[3] == {}
+
+
+def test_rows_too_old_to_serve_are_purged_on_write(cache):
+    cache.put_many(1, {"data_gov": "old"})
+    cache.put_many(2, {"data_gov": "stale"})
+    rows = {row.usdotNumber: row for row in CarrierCache.query.all()}
+    rows[1].fetched_at = datetime.utcnow() - timedelta(
+        seconds=cache.ttl + CARRIER_CACHE_STALE_TTL + 60
+    )
+    rows[2].fetched_at = datetime.utcnow() - timedelta(seconds=cache.ttl + 60)
+    db.session.commit()
+    cache._purged_at = None
+
+    cache.put_many(3, {"data_gov": "new"})
+
+    assert {row.usdotNumber for row in CarrierCache.query.all()} == {2, 3}
+    assert cache.stats()["purged"] == 1
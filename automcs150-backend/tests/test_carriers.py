@@ -0,0 +1,119 @@
+import pytest
+import utils.carriers as carriers
+from utils.carrier_cache import carrier_cache
+from utils.circuit_breaker import BREAKER_OPEN
+
+
+@pytest.fixture(autouse=True)
+def fresh_carrier_state(app):
+    """Every test starts with an empty cache and closed breakers."""
+    with carrier_cache._lock:
+        carrier_cache._entries.clear()
+    for breaker in carriers._breakers.values():
+        breaker.__init__(breaker.name, breaker.max_failures, breaker.cooldown)
+
+
+def lookup(client, auth_headers, usdot_number, refresh=False):
+    query = f"usdot_number={usdot_number}" + ("&refresh=1" if refresh else "")
+    return client.get(
+        f"/api/filing/get_by_usdot_number?{query}", headers=auth_headers
+    )
+
+
+def test_lookup_requires_a_token(client):
+    assert client.get("/api/filing/get_by_usdot_number?usdot_number=1").status_code == 401
+
+
+def test_lookup_success(client, auth_headers, upstream):
+    response = lookup(client, auth_headers, 1234567)
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["data_gov"]["legal_name"] == "ACME"
+    assert body["mobile_fmcsa"] == {"dotNumber": 1234567}
+    assert body["sources"]["mobile_fmcsa"]["status"] == carriers.SOURCE_OK
+    assert body["sources"]["mobile_fmcsa"]["origin"] == "upstream"
+
+
+def test_lookup_not_found(client, auth_headers, upstream):
+    upstream.modes.update({"data_gov": "empty", "mobile": "empty", "safer": "empty"})
+
+    response = lookup(client, auth_headers, 7654321)
+
+    assert response.status_code == 404
+    statuses = {
+        name: source["status"]
+        for name, source in response.get_json()["sources"].items()
+    }
+    assert set(statuses.values()) == {carriers.SOURCE_NOT_FOUND}
+
+
+def test_lookup_answers_repeat_from_cache(client, auth_headers, upstream):
+    lookup(client, auth_headers, 1111111)
+    calls = dict(upstream.calls)
+
+    response = lookup(client, auth_headers, 1111111)
+
+    assert upstream.calls == calls
+    assert response.get_json()["sources"]["mobile_fmcsa"]["origin"] == "cache"
+
+
+def test_slow_source_times_out_without_holding_up_the_rest(
+    client, auth_headers, upstream
+):
+    upstream.modes["mobile"] = "slow"
+
+    response = lookup(client, auth_headers, 2222222)
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["sources"]["mobile_fmcsa"]["status"] == carriers.SOURCE_TIMEOUT
+    assert body["mobile_fmcsa"] is None
+    assert body["sources"]["data_gov"]["status"] == carriers.SOURCE_OK
+
+
+def test_transient_upstream_error_is_retried(client, auth_headers, upstream):
+    upstream.modes["mobile"] = "flaky"
+
+    response = lookup(client, auth_headers, 3333333)
+
+    assert response.get_json()["sources"]["mobile_fmcsa"]["status"] == carriers.SOURCE_OK
+    assert upstream.calls["mobile"] == 2
+
+
+def test_failing_sources_answer_502(client, auth_headers, upstream):
+    upstream.modes.update({"data_gov": "fail", "mobile": "fail", "safer": "fail"})
+
+    response = lookup(client, auth_headers, 4444444)
+
+    assert response.status_code == 502
+    assert response.get_json()["sources"]["safer_data"]["status"] == carriers.SOURCE_ERROR
+
+
+def test_breaker_opens_and_skips_the_source(client, auth_headers, upstream):
+    upstream.modes["mobile"] = "fail"
+    for attempt in range(carriers.CARRIER_BREAKER_FAILURES):
+        lookup(client, auth_headers, 5555555, refresh=True)
+    assert carriers._breakers["mobile_fmcsa"].state == BREAKER_OPEN
+
+    upstream.modes["mobile"] = "ok"
+    calls = upstream.calls["mobile"]
+    response = lookup(client, auth_headers, 5555555, refresh=True)
+
+    source = response.get_json()["sources"]["mobile_fmcsa"]
+    assert source["status"] == carriers.SOURCE_CIRCUIT_OPEN
+    assert source["breaker"] == BREAKER_OPEN
+    assert upstream.calls["mobile"] == calls
+
+
+def test_batch_lookup_queries_data_gov_in_chunks(client, auth_headers, upstream):
+    response = client.post(
+        "/api/filing/lookup_batch",
+        json={"usdot_numbers": [1, 2, 3]},
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 200
+    found = response.get_json()["carriers"]
+    assert sorted(found) == ["1", "2", "3"]
+    assert upstream.calls["data_gov"] == 1
@@ -0,0 +1,14 @@
+from utils.census import find_census_rows, import_census
+
+
+def test_last_row_wins_for_a_repeated_carrier(app, tmp_path):
+    census = tmp_path / "census.csv"
+    census.write_text(
+        "DOT_NUMBER,LEGAL_NAME\n1,OLD NAME\n2,OTHER\n1,NEW NAME\n", encoding="utf-8"
+    )
+
+    assert import_census(str(census)) == 3
+
+    rows = find_census_rows([1, 2])
+    assert rows[1]["legal_name"] == "NEW NAME"
+    assert rows[2]["legal_name"] == "OTHER"
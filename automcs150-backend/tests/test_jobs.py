@@ -0,0 +1,116 @@
+from datetime import datetime, timedelta
+import pytest
+from benchmarks.payloads import PAYLOADS
+from extensions import db
+from models import PdfJob, User
+from utils.jobs import claim_next_job, requeue_stale_jobs, run_job
+import utils.jobs as jobs
+
+
+@pytest.fixture
+def filled(monkeypatch):
+    """Replace the PDF fill with a recorder; the template is not in the repo."""
+    calls = []
+
+    def generate_filing(form_data, decoded, fill_mode=None):
+        calls.append((form_data, decoded, fill_mode))
+        return "Success", f"USDOT_{len(calls)}.pdf"
+
+    monkeypatch.setattr(jobs, "generate_filing", generate_filing)
+    return calls
+
+
+def queue(client, auth_headers, query="mode=job"):
+    response = client.post(
+        f"/api/filing/generate_pdf?{query}",
+        json=PAYLOADS["minimal"],
+        headers=auth_headers,
+    )
+    assert response.status_code == 202
+    return response.get_json()["job_id"]
+
+
+def job_status(client, auth_headers, job_id):
+    return client.get(f"/api/filing/jobs/{job_id}", headers=auth_headers).get_json()
+
+
+def test_queued_job_runs_and_reports_its_filing(client, user, auth_headers, filled):
+    job_id = queue(client, auth_headers)
+    assert job_status(client, auth_headers, job_id)["status"] == "queued"
+
+    run_job(claim_next_job())
+
+    status = job_status(client, auth_headers, job_id)
+    assert status["status"] == "done"
+    assert status["filing_name"] == "USDOT_1.pdf"
+    assert filled[0][1]["sub"] == str(user.id)
+
+
+def test_queued_job_keeps_its_fill_mode(client, auth_headers, filled):
+    queue(client, auth_headers, "mode=job&fill_mode=fast")
+
+    run_job(claim_next_job())
+
+    assert filled[0][2] == "fast"
+
+
+def test_jobs_are_claimed_oldest_first_and_once(client, auth_headers, filled):
+    first = queue(client, auth_headers)
+    second = queue(client, auth_headers)
+
+    assert claim_next_job().id == first
+    assert claim_next_job().id == second
+    assert claim_next_job() is None
+
+
+def test_failed_job_records_the_error(client, auth_headers, monkeypatch):
+    def generate_filing(form_data, decoded, fill_mode=None):
+        raise RuntimeError("template missing")
+
+    monkeypatch.setattr(jobs, "generate_filing", generate_filing)
+    job_id = queue(client, auth_headers)
+
+    run_job(claim_next_job())
+
+    status = job_status(client, auth_headers, job_id)
+    assert status["status"] == "failed"
+    assert status["error"] == "template missing"
+
+
+def test_stale_running_jobs_are_requeued(client, auth_headers, filled):
+    job_id = queue(client, auth_headers)
+    job = claim_next_job()
+    job.started_at = datetime.utcnow() - timedelta(hours=1)
+    db.session.commit()
+
+    assert requeue_stale_jobs(600) == 1
+    assert db.session.get(PdfJob, job_id).status == "queued"
+
+
+def test_job_that_keeps_killing_its_worker_fails(client, auth_headers, filled):
+    job_id = queue(client, auth_headers)
+    for attempt in range(3):
+        job = claim_next_job()
+        job.started_at = datetime.utcnow() - timedelta(hours=1)
+        db.session.commit()
+        requeued = requeue_stale_jobs(600, max_attempts=3)
+
+    assert requeued == 0
+    job = db.session.get(PdfJob, job_id)
+    assert job.status == "failed"
+    assert job.attempts == 3
+    assert job.error == "Worker stopped during all 3 attempts"
+    assert claim_next_job() is None
+
+
+def test_other_users_cannot_see_a_job(client, auth_headers, filled):
+    job_id = queue(client, auth_headers)
+    other = User(email="other@example.com", password="x", status=1)
+    db.session.add(other)
+    db.session.commit()
+    db.session.get(PdfJob, job_id).userId = other.id
+    db.session.commit()
+
+    response = client.get(f"/api/filing/jobs/{job_id}", headers=auth_headers)
+
+    assert response.status_code == 404
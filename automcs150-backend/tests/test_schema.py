@@ -0,0 +1,27 @@
+import os
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect, text
+from commands.schema import unversioned_revision
+from extensions import db
+
+MIGRATIONS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations"
+)
+
+
+def test_create_all_schema_is_stamped_at_head(app):
+    head = ScriptDirectory(MIGRATIONS_DIR).get_current_head()
+
+    # a new migration needs a marker in REVISION_MARKERS too
+    assert unversioned_revision(inspect(db.engine)) == head
+
+
+def test_versioned_database_is_left_alone(app):
+    with db.engine.begin() as connection:
+        connection.execute(text("CREATE TABLE alembic_version (version_num VARCHAR(32))"))
+
+    try:
+        assert unversioned_revision(inspect(db.engine)) is None
+    finally:
+        with db.engine.begin() as connection:
+            connection.execute(text("DROP TABLE alembic_version"))
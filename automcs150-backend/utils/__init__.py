@@ -1,2 +1,48 @@
-from utils.export import fill_pdf_annotations
-from utils.notification import add_notifications
\ No newline at end of file
+from utils.export import fill_pdf_annotations, MCS150_TEMPLATE
+from utils.mcs150_fields import FILL_MODES
+from utils.template_cache import warm_template_cache
+from utils.batch import fill_pdf_batch, start_pdf_fork_server, stream_zip, PDF_BATCH_MAX_ITEMS
+from utils.notification import add_notifications
+from utils.filing import (
+    build_filing_history,
+    filing_content_hash,
+    generate_filing,
+    generate_filing_bytes,
+)
+from utils.jobs import enqueue_pdf_job, claim_next_job, run_job
+from utils.storage import generated_file_path, new_generated_path
+from utils.previews import get_preview, schedule_preview, PREVIEW_DEFAULT_DPI
+from utils.validation import validate_mcs150_payload, PayloadError
+from utils.carriers import (
+    lookup_carrier,
+    lookup_carriers,
+    carrier_lookup_stats,
+    carrier_source_health,
+    LOOKUP_BATCH_MAX_ITEMS,
+    SOURCE_CIRCUIT_OPEN,
+    SOURCE_ERROR,
+    SOURCE_NOT_FOUND,
+    SOURCE_TIMEOUT,
+)
+from utils.carrier_cache import carrier_cache
+from utils.auth import (
+    admin_required,
+    authenticate,
+    current_user,
+    login_required,
+    verify_token,
+)
+from utils.passwords import (
+    hash_password,
+    needs_rehash,
+    password_hash_stats,
+    verify_password,
+    PasswordHasherBusy,
+)
+from utils.throttle import (
+    login_retry_after,
+    login_throttle_stats,
+    record_login_failure,
+    reset_login_failures,
+)
+from utils.last_login import flush_last_logins, record_last_login
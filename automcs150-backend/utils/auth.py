@@ -0,0 +1,114 @@
+from collections import OrderedDict
+from functools import wraps
+import os
+import threading
+import time
+from flask import g, jsonify, request
+import jwt
+from extensions import db
+from models import User
+
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", 1024))
+
+# raw token -> verified claims, most recently used last
+_verified = OrderedDict()
+_verified_lock = threading.Lock()
+
+
+def verify_token(token):
+    """Return the claims of a signed JWT.
+
+    Verified tokens are remembered (AUTH_TOKEN_CACHE_SIZE of them), so a
+    client's repeat requests skip the signature check; a remembered token
+    still stops working at its exp. Raises jwt.InvalidTokenError.
+    """
+    with _verified_lock:
+        claims = _verified.get(token)
+        if claims is not None:
+            _verified.move_to_end(token)
+    if claims is not None:
+        if "exp" in claims and claims["exp"] <= time.time():
+            with _verified_lock:
+                _verified.pop(token, None)
+            raise jwt.ExpiredSignatureError("Signature has expired")
+        return claims
+
+    claims = jwt.decode(token, os.getenv("JWT_SECRET_KEY"), algorithms=["HS256"])
+    with _verified_lock:
+        _verified[token] = claims
+        while len(_verified) > AUTH_TOKEN_CACHE_SIZE:
+            _verified.popitem(last=False)
+    return claims
+
+
+def authenticate():
+    """Verify the request's bearer token and put its claims on g.
+
+    Returns None on success, or the 401 response to send.
+    """
+    header = request.headers.get("Authorization", "")
+    scheme, _, token = header.partition(" ")
+    if scheme != "Bearer" or not token:
+        return jsonify({"message": "Missing or invalid token"}), 401
+    try:
+        g.claims = verify_token(token)
+    except jwt.ExpiredSignatureError:
+        return jsonify({"message": "Token has expired"}), 401
+    except jwt.InvalidTokenError:
+        return jsonify({"message": "Invalid token"}), 401
+    g.user_id = g.claims.get("sub")
+    return None
+
+
+def current_user():
+    """The User the request's token belongs to, loaded on first use."""
+    if "user" not in g:
+        try:
+            user_id = int(g.user_id)
+        except (TypeError, ValueError):
+            # a validly signed token whose sub is not a user id
+            user_id = None
+        g.user = db.session.get(User, user_id) if user_id is not None else None
+    return g.user
+
+
+def login_required(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        error = authenticate()
+        if error is not None:
+            return error
+        return view(*args, **kwargs)
+
+    return wrapper
+
+
+def admin_required(view):
+    """Like login_required, but the user must currently be an active admin.
+
+    Checked against the database rather than the token's isAdmin claim, so
+    a demoted or deactivated admin loses access before the token expires.
+    """
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        error = authenticate()
+        if error is not None:
+            return error
+        user = current_user()
+        if user is None:
+            return jsonify({"message": "Invalid token"}), 401
+        if not user.isAdmin or user.status == False:
+            return jsonify({"message": "You’re not allowed to fetch data."}), 403
+        return view(*args, **kwargs)
+
+    return wrapper
+
+
+def _reset_after_fork():
+    global _verified_lock
+    _verified_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,127 @@
+from concurrent.futures import ProcessPoolExecutor
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import zipfile
+from utils.export import fill_pdf_annotations, MCS150_TEMPLATE
+from utils.template_cache import warm_template_cache
+
+logger = logging.getLogger(__name__)
+
+PDF_BATCH_WORKERS = int(os.getenv("PDF_BATCH_WORKERS", os.cpu_count() or 1))
+PDF_BATCH_MAX_ITEMS = int(os.getenv("PDF_BATCH_MAX_ITEMS", 500))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _mp_context():
+    # Workers run request, hashing and refresh threads, and forking a
+    # threaded process can leave the child stuck on a lock some other thread
+    # held. Pool processes come from a single-threaded fork server instead.
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+def start_pdf_fork_server():
+    """Start this process's fork server with the PDF modules imported.
+
+    Call it early in each gunicorn worker (a fork server belongs to the
+    process that started it), so a batch's pool processes start from a
+    warm, single-threaded parent.
+    """
+    context = _mp_context()
+    if context.get_start_method() == "forkserver":
+        context.set_forkserver_preload([__name__])
+        from multiprocessing import forkserver
+
+        forkserver.ensure_running()
+
+
+def _init_pool_process():
+    warm_template_cache(MCS150_TEMPLATE.path)
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=PDF_BATCH_WORKERS,
+                    mp_context=_mp_context(),
+                    initializer=_init_pool_process,
+                )
+    return _pool
+
+
+def _reset_after_fork():
+    # A pool created in the gunicorn master cannot be used from a worker.
+    global _pool, _pool_lock
+    _pool = None
+    _pool_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _fill_one(output_pdf_path, form_data, fill_mode):
+    return fill_pdf_annotations(MCS150_TEMPLATE, output_pdf_path, form_data, fill_mode)
+
+
+def fill_pdf_batch(jobs, fill_mode=None):
+    """Fill [(output_pdf_path, form_data), ...] across the process pool.
+
+    Returns one "Success"/"Failed" result per job, in input order.
+    """
+    pool = _get_pool()
+    futures = [
+        pool.submit(_fill_one, path, form_data, fill_mode) for path, form_data in jobs
+    ]
+    results = []
+    for future in futures:
+        try:
+            results.append(future.result())
+        except Exception as exception:
+            logger.error(f"Batch PDF fill failed: {exception}", exc_info=True)
+            results.append("Failed")
+    return results
+
+
+class _ZipBuffer:
+    """Write-only sink for zipfile that lets the archive be streamed in chunks."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_zip(files, manifest):
+    """Yield a ZIP of [(path on disk, name in archive), ...] plus manifest.json."""
+    buffer = _ZipBuffer()
+    # PDFs are already compressed, so only the manifest is deflated.
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:
+        for path, arcname in files:
+            archive.write(path, arcname)
+            yield buffer.drain()
+        archive.writestr(
+            "manifest.json",
+            json.dumps(manifest, indent=2, default=str),
+            compress_type=zipfile.ZIP_DEFLATED,
+        )
+    yield buffer.drain()
@@ -0,0 +1,236 @@
+from collections import Counter, OrderedDict, namedtuple
+from datetime import datetime, timedelta, timezone
+import json
+import logging
+import os
+import threading
+import time
+from extensions import db
+from models import CarrierCache
+
+logger = logging.getLogger(__name__)
+
+CARRIER_CACHE_TTL = int(os.getenv("CARRIER_CACHE_TTL", 6 * 60 * 60))
+CARRIER_CACHE_SIZE = int(os.getenv("CARRIER_CACHE_SIZE", 2048))
+# how long past the TTL an entry may still be served while it is refreshed
+CARRIER_CACHE_STALE_TTL = int(os.getenv("CARRIER_CACHE_STALE_TTL", 7 * 24 * 60 * 60))
+# how often a worker deletes the rows too old to be served even when stale
+CARRIER_CACHE_PURGE_INTERVAL = int(os.getenv("CARRIER_CACHE_PURGE_INTERVAL", 60 * 60))
+
+# value is the source's result (None for "not found"); fetched_at is epoch
+# seconds, so ages agree between the memory and database tiers.
+CacheEntry = namedtuple("CacheEntry", ["value", "fetched_at"])
+
+
+def _epoch(fetched_at):
+    return fetched_at.replace(tzinfo=timezone.utc).timestamp()
+
+
+class CarrierLookupCache:
+    """Two-tier TTL cache of carrier source results keyed by (USDOT, source).
+
+    An in-process LRU answers repeat lookups without touching the database;
+    the CarrierCache table is shared by every gunicorn worker. Database
+    errors are logged and treated as misses, never raised. Writes also
+    delete, at most every purge_interval seconds, the rows older than the
+    TTL plus CARRIER_CACHE_STALE_TTL, which no lookup would use.
+    """
+
+    def __init__(
+        self,
+        ttl=CARRIER_CACHE_TTL,
+        size=CARRIER_CACHE_SIZE,
+        purge_interval=CARRIER_CACHE_PURGE_INTERVAL,
+    ):
+        self.ttl = ttl
+        self.size = size
+        self.purge_interval = purge_interval
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._stats = Counter()
+        self._purged_at = None
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def is_stale(self, entry, now=None):
+        return (now or time.time()) - entry.fetched_at >= self.ttl
+
+    def _from_memory(self, keys, now, max_age):
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and now - entry.fetched_at < max_age:
+                    self._entries.move_to_end(key)
+                    found[key] = entry
+            self._stats["memory_hits"] += len(found)
+        return found
+
+    def _from_database(self, keys, now, max_age):
+        try:
+            rows = CarrierCache.query.filter(
+                CarrierCache.usdotNumber.in_({key[0] for key in keys}),
+                CarrierCache.source.in_({key[1] for key in keys}),
+            ).all()
+        except Exception as exception:
+            db.session.rollback()
+            logger.warning(f"Carrier cache read failed: {exception}")
+            self._count("db_errors")
+            return {}
+        found = {}
+        for row in rows:
+            key = (row.usdotNumber, row.source)
+            if key not in keys:
+                continue
+            entry = CacheEntry(json.loads(row.payload), _epoch(row.fetched_at))
+            if now - entry.fetched_at < max_age:
+                self._remember(key, entry)
+                found[key] = entry
+        self._count("db_hits", len(found))
+        return found
+
+    def get_bulk(self, usdot_numbers, sources, max_age=None):
+        """Return {usdot_number: {source: CacheEntry}} for the fresh entries.
+
+        Entries up to max_age seconds old count (the TTL by default; pass a
+        longer one to also get stale entries, see is_stale). Whatever the
+        LRU misses is read from the shared table in one query.
+        """
+        now = time.time()
+        max_age = max_age or self.ttl
+        keys = {
+            (usdot_number, source)
+            for usdot_number in usdot_numbers
+            for source in sources
+        }
+        found = self._from_memory(keys, now, max_age)
+        missing = keys - found.keys()
+        if missing:
+            found.update(self._from_database(missing, now, max_age))
+        self._count("misses", len(keys) - len(found))
+        by_carrier = {usdot_number: {} for usdot_number in usdot_numbers}
+        for (usdot_number, source), entry in found.items():
+            by_carrier[usdot_number][source] = entry
+        return by_carrier
+
+    def get_many(self, usdot_number, sources, max_age=None):
+        """Return {source: CacheEntry} for one carrier, as get_bulk."""
+        return self.get_bulk([usdot_number], sources, max_age)[usdot_number]
+
+    def put_bulk(self, values):
+        """Store {usdot_number: {source: value}} in both tiers, in one commit."""
+        values = {
+            usdot_number: carrier_values
+            for usdot_number, carrier_values in values.items()
+            if carrier_values
+        }
+        if not values:
+            return
+        fetched_at = datetime.now(timezone.utc).replace(tzinfo=None)
+        entries = [
+            (usdot_number, source, value)
+            for usdot_number, carrier_values in values.items()
+            for source, value in carrier_values.items()
+        ]
+        for usdot_number, source, value in entries:
+            self._remember(
+                (usdot_number, source), CacheEntry(value, _epoch(fetched_at))
+            )
+        try:
+            for usdot_number, source, value in entries:
+                db.session.merge(
+                    CarrierCache(
+                        usdotNumber=usdot_number,
+                        source=source,
+                        payload=json.dumps(value),
+                        fetched_at=fetched_at,
+                    )
+                )
+            db.session.commit()
+        except Exception as exception:
+            # e.g. another worker inserted the same key first; theirs is as good
+            db.session.rollback()
+            logger.warning(f"Carrier cache write failed: {exception}")
+            self._count("db_errors")
+        self._count("stores", len(entries))
+        self._purge_if_due()
+
+    def purge_expired(self):
+        """Delete the shared rows too old to be served; returns how many."""
+        cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(
+            seconds=self.ttl + CARRIER_CACHE_STALE_TTL
+        )
+        try:
+            count = CarrierCache.query.filter(CarrierCache.fetched_at < cutoff).delete()
+            db.session.commit()
+        except Exception as exception:
+            db.session.rollback()
+            logger.warning(f"Carrier cache purge failed: {exception}")
+            self._count("db_errors")
+            return 0
+        self._count("purged", count)
+        return count
+
+    def _purge_if_due(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._purged_at is not None and (
+                now - self._purged_at < self.purge_interval
+            ):
+                return
+            self._purged_at = now
+        self.purge_expired()
+
+    def put_many(self, usdot_number, values):
+        """Store {source: value} for one carrier in both tiers."""
+        self.put_bulk({usdot_number: values})
+
+    def stats(self):
+        """Counters for this worker process, plus the LRU's size and age."""
+        now = time.time()
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["oldest_entry_age_seconds"] = (
+                round(now - min(entry.fetched_at for entry in self._entries.values()))
+                if self._entries
+                else None
+            )
+        stats["ttl_seconds"] = self.ttl
+        stats["stale_ttl_seconds"] = CARRIER_CACHE_STALE_TTL
+        for name in (
+            "memory_hits",
+            "db_hits",
+            "misses",
+            "stores",
+            "purged",
+            "db_errors",
+        ):
+            stats.setdefault(name, 0)
+        lookups = stats["memory_hits"] + stats["db_hits"] + stats["misses"]
+        stats["hit_rate"] = (
+            round((stats["memory_hits"] + stats["db_hits"]) / lookups, 3)
+            if lookups
+            else None
+        )
+        return stats
+
+
+carrier_cache = CarrierLookupCache()
+
+
+def _reset_after_fork():
+    carrier_cache._lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
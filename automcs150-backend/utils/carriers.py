@@ -0,0 +1,498 @@
+from collections import Counter
+from concurrent.futures import (
+    CancelledError,
+    Future,
+    ThreadPoolExecutor,
+    TimeoutError as FutureTimeout,
+    wait,
+)
+import json
+import logging
+import os
+import threading
+import time
+from flask import current_app
+from utils.carrier_cache import carrier_cache, CARRIER_CACHE_STALE_TTL
+from utils.census import (
+    find_census_rows,
+    CENSUS_MIRROR,
+    CENSUS_MIRROR_OFF,
+    CENSUS_MIRROR_ONLY,
+)
+from utils.circuit_breaker import CircuitBreaker
+from utils.upstream import upstream_get, upstream_post
+
+logger = logging.getLogger(__name__)
+
+DATA_GOV_URL = os.getenv(
+    "DATA_GOV_CARRIER_URL", "https://data.transportation.gov/resource/az4n-8mr2.json"
+)
+FMCSA_MOBILE_URL = os.getenv(
+    "FMCSA_MOBILE_URL", "https://mobile.fmcsa.dot.gov/qc/services/carriers"
+)
+SAFER_QUERY_URL = os.getenv("SAFER_QUERY_URL", "https://safer.fmcsa.dot.gov/query.asp")
+FMCSA_WEB_KEY = os.getenv(
+    "FMCSA_WEB_KEY", "70b23b9681392a109931da0d765962bd3e71eec6"
+)
+CARRIER_SOURCE_TIMEOUT = float(os.getenv("CARRIER_SOURCE_TIMEOUT", 8))
+LOOKUP_BATCH_MAX_ITEMS = int(os.getenv("LOOKUP_BATCH_MAX_ITEMS", 200))
+LOOKUP_BATCH_TIMEOUT = float(os.getenv("LOOKUP_BATCH_TIMEOUT", 30))
+LOOKUP_BATCH_CONCURRENCY = int(os.getenv("LOOKUP_BATCH_CONCURRENCY", 6))
+DATA_GOV_CHUNK_SIZE = int(os.getenv("DATA_GOV_CHUNK_SIZE", 100))
+CARRIER_BREAKER_FAILURES = int(os.getenv("CARRIER_BREAKER_FAILURES", 5))
+CARRIER_BREAKER_COOLDOWN = float(os.getenv("CARRIER_BREAKER_COOLDOWN", 30))
+CARRIER_BREAKER_SLOW_SECONDS = float(os.getenv("CARRIER_BREAKER_SLOW_SECONDS", 5))
+
+SOURCE_OK = "ok"
+SOURCE_NOT_FOUND = "not_found"
+SOURCE_TIMEOUT = "timeout"
+SOURCE_ERROR = "error"
+SOURCE_CIRCUIT_OPEN = "circuit_open"
+
+# sources of concurrent lookups share these threads and the upstream pools
+_pool = ThreadPoolExecutor(max_workers=12, thread_name_prefix="carrier")
+# batches get their own, smaller pool so they cannot starve single lookups
+_batch_pool = ThreadPoolExecutor(
+    max_workers=LOOKUP_BATCH_CONCURRENCY, thread_name_prefix="carrier-batch"
+)
+
+
+def fetch_data_gov(usdot_number, timeout):
+    response = upstream_get(
+        DATA_GOV_URL, timeout, params={"dot_number": usdot_number}
+    )
+    response.raise_for_status()
+    rows = response.json()
+    return rows[0] if rows else None
+
+
+def fetch_data_gov_chunk(usdot_numbers, timeout):
+    """Fetch the census rows of many carriers in one SoQL query."""
+    # the numbers are ints, so they are safe to inline
+    numbers = ", ".join(f"'{usdot_number}'" for usdot_number in usdot_numbers)
+    response = upstream_get(
+        DATA_GOV_URL,
+        timeout,
+        params={
+            "$where": f"dot_number in({numbers})",
+            "$limit": len(usdot_numbers) * 10,
+        },
+    )
+    response.raise_for_status()
+    rows = {}
+    for row in response.json():
+        # first row wins, as in fetch_data_gov
+        rows.setdefault(int(row["dot_number"]), row)
+    return rows
+
+
+def fetch_safer(usdot_number, timeout):
+    # CompanySnapshot's own session has no timeout or pooling, so post the
+    # snapshot form ourselves and reuse the library's parser. This is the
+    # only SAFER client; python-safer is imported on first use.
+    import safer.api
+    from safer.crawler import parse_html_to_tree
+    from safer.html import process_company_snapshot
+    from safer.results import Company
+
+    # SAFER serves its snapshot form to browsers; Host comes from the URL.
+    headers = {
+        name: value
+        for name, value in safer.api.sess.headers.items()
+        if name != "Host"
+    }
+    response = upstream_post(
+        SAFER_QUERY_URL,
+        timeout,
+        headers=headers,
+        data={
+            "searchType": "ANY",
+            "query_type": "queryCarrierSnapshot",
+            "query_param": "USDOT",
+            "query_string": usdot_number,
+        },
+    )
+    response.raise_for_status()
+    tree = parse_html_to_tree(response.text)
+    if tree is None or len(tree) == 0:
+        return None
+    return json.loads(Company(data=process_company_snapshot(tree)).to_json())
+
+
+def fetch_mobile_fmcsa(usdot_number, timeout):
+    response = upstream_get(
+        f"{FMCSA_MOBILE_URL}/{usdot_number}",
+        timeout,
+        params={"webKey": FMCSA_WEB_KEY},
+    )
+    response.raise_for_status()
+    content = response.json().get("content")
+    return content["carrier"] if content else None
+
+
+# response key -> fetch(usdot_number, timeout); None means "not found"
+CARRIER_SOURCES = {
+    "data_gov": fetch_data_gov,
+    "safer_data": fetch_safer,
+    "mobile_fmcsa": fetch_mobile_fmcsa,
+}
+
+
+_breakers = {
+    name: CircuitBreaker(name, CARRIER_BREAKER_FAILURES, CARRIER_BREAKER_COOLDOWN)
+    for name in CARRIER_SOURCES
+}
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+# single flight: (usdot_number, refresh) -> Future of the lookup in progress
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+_flight_stats = Counter()
+
+
+def carrier_source_health():
+    """Breaker state of every carrier source in this worker process."""
+    return {name: breaker.snapshot() for name, breaker in _breakers.items()}
+
+
+def carrier_lookup_stats():
+    """How many lookups in this worker led a flight or joined one."""
+    with _in_flight_lock:
+        return {
+            "leaders": _flight_stats["leaders"],
+            "coalesced": _flight_stats["coalesced"],
+            "in_flight": len(_in_flight),
+        }
+
+
+def _timed(fetch, usdot_number, timeout):
+    started = time.monotonic()
+    try:
+        return fetch(usdot_number, timeout), None, time.monotonic() - started
+    except Exception as exception:
+        return None, exception, time.monotonic() - started
+
+
+def _record(name, ok, elapsed):
+    # a slow answer counts against the breaker just like a failed one
+    _breakers[name].record(ok and elapsed < CARRIER_BREAKER_SLOW_SECONDS)
+
+
+def _fetch_source(name, fetch, usdot_number, timeout):
+    """_timed, reporting the outcome to name's breaker when the fetch ends.
+
+    Only fetches that actually ran are counted: one cancelled while queued
+    behind a big batch says nothing about the upstream.
+    """
+    value, error, elapsed = _timed(fetch, usdot_number, timeout)
+    _record(name, error is None, elapsed)
+    return value, error, elapsed
+
+
+def _cancel_queued(futures, deadline):
+    """Wait for futures until deadline, then cancel those not yet started."""
+    wait(futures, max(0, deadline - time.monotonic()))
+    for future in futures:
+        future.cancel()
+
+
+def _source_status(value):
+    return SOURCE_OK if value is not None else SOURCE_NOT_FOUND
+
+
+def _source_info(status, origin, elapsed=0, error=None, age=None):
+    return {
+        "status": status,
+        "origin": origin,
+        "cached": origin == "cache",
+        "stale": age is not None and age >= carrier_cache.ttl,
+        "age_seconds": round(age) if age is not None else None,
+        "elapsed_ms": round(elapsed * 1000),
+        "error": str(error) if error is not None else None,
+    }
+
+
+def _cached_source(entry, now):
+    return entry.value, _source_info(
+        _source_status(entry.value), "cache", age=now - entry.fetched_at
+    )
+
+
+def _collect(future, deadline, timeout, label):
+    """Wait for a _fetch_source future until deadline; return (value, source info).
+
+    The breaker is not touched here: _fetch_source records the fetch when it
+    ends, even if that is after the deadline.
+    """
+    try:
+        value, error, elapsed = future.result(max(0, deadline - time.monotonic()))
+    except (FutureTimeout, CancelledError):
+        future.cancel()
+        value, error, elapsed = None, None, timeout
+        status = SOURCE_TIMEOUT
+    else:
+        status = SOURCE_ERROR if error is not None else _source_status(value)
+    if status in (SOURCE_TIMEOUT, SOURCE_ERROR):
+        logger.warning(f"Carrier source {label} {status}: {error}")
+    return value, _source_info(status, "upstream", elapsed, error)
+
+
+def _cacheable(info):
+    return info["origin"] == "upstream" and info["status"] in (
+        SOURCE_OK,
+        SOURCE_NOT_FOUND,
+    )
+
+
+def _mirrored_census(usdot_numbers, refresh):
+    """Answer data_gov from the census mirror; {usdot_number: (value, info)}.
+
+    Carriers the mirror lacks are left to data.gov, unless it is the only
+    source allowed. A refresh skips the mirror when data.gov may be asked.
+    """
+    if CENSUS_MIRROR == CENSUS_MIRROR_OFF or not usdot_numbers:
+        return {}
+    if refresh and CENSUS_MIRROR != CENSUS_MIRROR_ONLY:
+        return {}
+    rows = find_census_rows(usdot_numbers)
+    answered = {}
+    for usdot_number in usdot_numbers:
+        if usdot_number in rows or CENSUS_MIRROR == CENSUS_MIRROR_ONLY:
+            value = rows.get(usdot_number)
+            answered[usdot_number] = value, _source_info(
+                _source_status(value), "mirror"
+            )
+    return answered
+
+
+def _cached_answers(usdot_numbers, names, refresh):
+    """Answer sources from the cache, stale entries included.
+
+    Returns ({usdot_number: {name: (value, info)}}, [(usdot_number, name)]
+    of the stale entries, which the caller should revalidate).
+    """
+    if refresh:
+        return {usdot_number: {} for usdot_number in usdot_numbers}, []
+    cached = carrier_cache.get_bulk(
+        usdot_numbers, names, carrier_cache.ttl + CARRIER_CACHE_STALE_TTL
+    )
+    now = time.time()
+    answered = {}
+    stale = []
+    for usdot_number, entries in cached.items():
+        answered[usdot_number] = {}
+        for name, entry in entries.items():
+            answered[usdot_number][name] = _cached_source(entry, now)
+            if carrier_cache.is_stale(entry, now):
+                stale.append((usdot_number, name))
+    return answered, stale
+
+
+def _refresh_in_background(app, keys):
+    fetched = {}
+    try:
+        for usdot_number, name in keys:
+            if not _breakers[name].allow():
+                continue
+            value, error, elapsed = _fetch_source(
+                name, CARRIER_SOURCES[name], usdot_number, CARRIER_SOURCE_TIMEOUT
+            )
+            if error is None:
+                fetched.setdefault(usdot_number, {})[name] = value
+        with app.app_context():
+            carrier_cache.put_bulk(fetched)
+    except Exception as exception:
+        logger.warning(f"Could not revalidate carrier cache: {exception}")
+    finally:
+        with _refreshing_lock:
+            _refreshing.difference_update(keys)
+
+
+def _revalidate(keys, pool):
+    """Refresh stale cache entries off the request thread, once per key."""
+    with _refreshing_lock:
+        keys = [key for key in keys if key not in _refreshing]
+        _refreshing.update(keys)
+    if keys:
+        pool.submit(_refresh_in_background, current_app._get_current_object(), keys)
+
+
+def _unavailable(name):
+    """The answer for a source whose breaker is open."""
+    return None, _source_info(SOURCE_CIRCUIT_OPEN, "upstream")
+
+
+def _with_breakers(answers, names):
+    sources = {name: answers[name][1] for name in names}
+    for name, info in sources.items():
+        info["breaker"] = _breakers[name].state
+    return {**{name: answers[name][0] for name in names}, "sources": sources}
+
+
+def lookup_carrier(usdot_number, timeout=CARRIER_SOURCE_TIMEOUT, refresh=False):
+    """Look up one carrier, see _lookup_carrier.
+
+    Concurrent calls for the same carrier in this worker are coalesced:
+    the first runs the lookup and the others wait for its result.
+    """
+    key = (usdot_number, refresh)
+    with _in_flight_lock:
+        flight = _in_flight.get(key)
+        leader = flight is None
+        if leader:
+            flight = _in_flight[key] = Future()
+        _flight_stats["leaders" if leader else "coalesced"] += 1
+    if not leader:
+        # the leader's lookup is bounded by its own deadline
+        return flight.result()
+    try:
+        result = _lookup_carrier(usdot_number, timeout, refresh)
+    except BaseException as exception:
+        # followers must never wait on a flight that will not land
+        flight.set_exception(exception)
+        raise
+    finally:
+        with _in_flight_lock:
+            del _in_flight[key]
+    flight.set_result(result)
+    return result
+
+
+def _lookup_carrier(usdot_number, timeout=CARRIER_SOURCE_TIMEOUT, refresh=False):
+    """Query every carrier source at once and return what arrived in time.
+
+    Sources with a cache entry are not queried unless refresh is set; stale
+    entries are served as they are and refreshed in the background. data_gov
+    is read from the census mirror when it has the carrier, and a source
+    whose circuit breaker is open is skipped. The result has one key per
+    source (None when it had nothing) plus "sources", mapping each source
+    to {"status", "origin", "cached", "stale", "age_seconds", "breaker",
+    "elapsed_ms", "error"}.
+    """
+    names = list(CARRIER_SOURCES)
+    answered, stale = _cached_answers([usdot_number], names, refresh)
+    answered = answered[usdot_number]
+    _revalidate(stale, _pool)
+    if "data_gov" not in answered:
+        mirrored = _mirrored_census([usdot_number], refresh)
+        if usdot_number in mirrored:
+            answered["data_gov"] = mirrored[usdot_number]
+    for name in names:
+        if name not in answered and not _breakers[name].allow():
+            answered[name] = _unavailable(name)
+    deadline = time.monotonic() + timeout
+    futures = {
+        name: _pool.submit(
+            _fetch_source, name, CARRIER_SOURCES[name], usdot_number, timeout
+        )
+        for name in names
+        if name not in answered
+    }
+    for name, future in futures.items():
+        answered[name] = _collect(
+            future, deadline, timeout, f"{name} for USDOT {usdot_number}"
+        )
+    carrier_cache.put_many(
+        usdot_number,
+        {name: value for name, (value, info) in answered.items() if _cacheable(info)},
+    )
+    return _with_breakers(answered, names)
+
+
+def lookup_carriers(usdot_numbers, timeout=LOOKUP_BATCH_TIMEOUT, refresh=False):
+    """Look up many carriers; returns {usdot_number: lookup_carrier result}.
+
+    data.gov census rows are fetched DATA_GOV_CHUNK_SIZE carriers per query;
+    the other sources are fetched per carrier, LOOKUP_BATCH_CONCURRENCY at a
+    time. Every fetch must finish within timeout of the call.
+    """
+    usdot_numbers = list(dict.fromkeys(usdot_numbers))
+    names = list(CARRIER_SOURCES)
+    answered, stale = _cached_answers(usdot_numbers, names, refresh)
+    _revalidate(stale, _batch_pool)
+    mirrored = _mirrored_census(
+        [n for n in usdot_numbers if "data_gov" not in answered[n]], refresh
+    )
+    for usdot_number, answer in mirrored.items():
+        answered[usdot_number]["data_gov"] = answer
+    for name in names:
+        if not _breakers[name].allow():
+            for usdot_number in usdot_numbers:
+                answered[usdot_number].setdefault(name, _unavailable(name))
+    deadline = time.monotonic() + timeout
+
+    census_pending = [n for n in usdot_numbers if "data_gov" not in answered[n]]
+    census_futures = [
+        (
+            chunk,
+            _batch_pool.submit(
+                _fetch_source, "data_gov", fetch_data_gov_chunk, chunk, timeout
+            ),
+        )
+        for chunk in (
+            census_pending[start : start + DATA_GOV_CHUNK_SIZE]
+            for start in range(0, len(census_pending), DATA_GOV_CHUNK_SIZE)
+        )
+    ]
+    futures = {
+        (usdot_number, name): _batch_pool.submit(
+            _fetch_source,
+            name,
+            CARRIER_SOURCES[name],
+            usdot_number,
+            CARRIER_SOURCE_TIMEOUT,
+        )
+        for usdot_number in usdot_numbers
+        for name in names
+        if name != "data_gov" and name not in answered[usdot_number]
+    }
+    # whatever is still queued at the deadline is dropped, not waited on
+    _cancel_queued(
+        [future for chunk, future in census_futures] + list(futures.values()),
+        deadline,
+    )
+
+    for chunk, future in census_futures:
+        rows, info = _collect(
+            future, deadline, timeout, f"data_gov for {len(chunk)} carriers"
+        )
+        for usdot_number in chunk:
+            value = rows.get(usdot_number) if rows is not None else None
+            answered[usdot_number]["data_gov"] = value, (
+                dict(info, status=_source_status(value)) if _cacheable(info) else info
+            )
+    for (usdot_number, name), future in futures.items():
+        answered[usdot_number][name] = _collect(
+            future, deadline, timeout, f"{name} for USDOT {usdot_number}"
+        )
+
+    carrier_cache.put_bulk(
+        {
+            usdot_number: {
+                name: value
+                for name, (value, info) in answers.items()
+                if _cacheable(info)
+            }
+            for usdot_number, answers in answered.items()
+        }
+    )
+    return {
+        usdot_number: _with_breakers(answered[usdot_number], names)
+        for usdot_number in usdot_numbers
+    }
+
+
+def _reset_after_fork():
+    # the parent's lookups never finish in the child; waiting on one of
+    # their futures would hang
+    global _refreshing_lock, _in_flight_lock
+    _refreshing_lock = threading.Lock()
+    _refreshing.clear()
+    _in_flight_lock = threading.Lock()
+    _in_flight.clear()
+    for breaker in _breakers.values():
+        breaker._after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,140 @@
+from datetime import datetime
+from itertools import islice
+import csv
+import gzip
+import io
+import json
+import logging
+import os
+from sqlalchemy import text
+from extensions import db
+from models import CensusCarrier
+
+logger = logging.getLogger(__name__)
+
+# off: always ask data.gov; first: use the mirror, fall back to data.gov
+# for carriers it lacks; only: never ask data.gov (offline mode)
+CENSUS_MIRROR_OFF = "off"
+CENSUS_MIRROR_FIRST = "first"
+CENSUS_MIRROR_ONLY = "only"
+CENSUS_MIRROR = os.getenv("CENSUS_MIRROR", CENSUS_MIRROR_FIRST)
+
+_UPSERT = text(
+    'INSERT INTO "CensusCarrier" ("dotNumber", data, imported_at) '
+    "VALUES (:dotNumber, :data, :imported_at) "
+    'ON CONFLICT ("dotNumber") DO UPDATE '
+    "SET data = excluded.data, imported_at = excluded.imported_at"
+)
+
+
+def iter_census_rows(path):
+    """Stream (dot number, row JSON) pairs from a census CSV export (or .gz).
+
+    Headers are lower-cased to match the API's field names, and empty values
+    are dropped, as the API omits them.
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", newline="", encoding="utf-8-sig") as census_file:
+        reader = csv.reader(census_file)
+        header = [name.strip().lower().replace(" ", "_") for name in next(reader)]
+        dot_column = header.index("dot_number")
+        for values in reader:
+            try:
+                dot_number = int(values[dot_column])
+            except (IndexError, ValueError):
+                continue
+            row = {name: value for name, value in zip(header, values) if value != ""}
+            yield dot_number, json.dumps(row, separators=(",", ":"))
+
+
+def _batches(rows, batch_size):
+    rows = iter(rows)
+    while batch := list(islice(rows, batch_size)):
+        yield batch
+
+
+def _copy_postgres(connection, rows, batch_size):
+    """COPY rows into a temp table in batches, then upsert them in one go.
+
+    The staging table numbers rows in file order, so when a carrier appears
+    more than once the last row wins, as it does with _insert_executemany.
+    """
+    cursor = connection.connection.cursor()
+    cursor.execute(
+        'CREATE TEMP TABLE census_import (LIKE "CensusCarrier", line bigserial) '
+        "ON COMMIT DROP"
+    )
+    for batch in _batches(rows, batch_size):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(batch)
+        buffer.seek(0)
+        cursor.copy_expert(
+            'COPY census_import ("dotNumber", data, imported_at) '
+            "FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+    cursor.execute(
+        'INSERT INTO "CensusCarrier" ("dotNumber", data, imported_at) '
+        'SELECT DISTINCT ON ("dotNumber") "dotNumber", data, imported_at '
+        'FROM census_import ORDER BY "dotNumber", line DESC '
+        'ON CONFLICT ("dotNumber") DO UPDATE '
+        "SET data = excluded.data, imported_at = excluded.imported_at"
+    )
+
+
+def _insert_executemany(connection, rows, batch_size):
+    for batch in _batches(rows, batch_size):
+        connection.execute(
+            _UPSERT,
+            [
+                {"dotNumber": dot_number, "data": data, "imported_at": imported_at}
+                for dot_number, data, imported_at in batch
+            ],
+        )
+
+
+def import_census(path, delta=False, batch_size=5000):
+    """Load a census CSV into the CensusCarrier mirror; returns the row count.
+
+    A full import replaces the mirror; a delta import upserts the rows it
+    contains and leaves every other carrier alone. Either way the load is
+    one transaction, so lookups never see a half-imported mirror.
+    """
+    imported_at = datetime.utcnow()
+    count = 0
+
+    def rows():
+        nonlocal count
+        for dot_number, data in iter_census_rows(path):
+            count += 1
+            yield dot_number, data, imported_at
+
+    with db.engine.begin() as connection:
+        if not delta:
+            connection.execute(text('DELETE FROM "CensusCarrier"'))
+        if connection.dialect.name == "postgresql":
+            _copy_postgres(connection, rows(), batch_size)
+        else:
+            _insert_executemany(connection, rows(), batch_size)
+    logger.info(f"Imported {count} census rows from {path} (delta={delta})")
+    return count
+
+
+def find_census_rows(usdot_numbers):
+    """Return {usdot_number: census row} for the carriers in the mirror."""
+    try:
+        rows = CensusCarrier.query.filter(
+            CensusCarrier.dotNumber.in_(usdot_numbers)
+        ).all()
+    except Exception as exception:
+        db.session.rollback()
+        logger.warning(f"Census mirror read failed: {exception}")
+        return {}
+    return {row.dotNumber: json.loads(row.data) for row in rows}
+
+
+def census_mirror_stats():
+    count, imported_at = db.session.query(
+        db.func.count(CensusCarrier.dotNumber), db.func.max(CensusCarrier.imported_at)
+    ).one()
+    return {"carriers": count, "last_import": imported_at}
@@ -0,0 +1,79 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Stops calling a failing upstream until a cooldown has passed.
+
+    After max_failures consecutive failures the breaker opens and allow()
+    refuses calls. Once cooldown seconds have passed a single trial call is
+    let through (half open); its outcome closes or re-opens the breaker.
+    State is per worker process.
+    """
+
+    def __init__(self, name, max_failures, cooldown):
+        self.name = name
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self.state = BREAKER_CLOSED
+        self.failures = 0
+        self.trips = 0
+        self._opened_at = None
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == BREAKER_CLOSED:
+                return True
+            if time.monotonic() - self._opened_at < self.cooldown:
+                return False
+            # one trial per cooldown; a trial that never reports back does
+            # not wedge the breaker half open
+            self.state = BREAKER_HALF_OPEN
+            self._opened_at = time.monotonic()
+            return True
+
+    def record(self, success):
+        with self._lock:
+            if success:
+                if self.state != BREAKER_CLOSED:
+                    logger.info(f"Circuit breaker {self.name} closed")
+                self.state = BREAKER_CLOSED
+                self.failures = 0
+                return
+            self.failures += 1
+            if self.state == BREAKER_HALF_OPEN or (
+                self.state == BREAKER_CLOSED and self.failures >= self.max_failures
+            ):
+                if self.state == BREAKER_CLOSED:
+                    self.trips += 1
+                    logger.warning(
+                        f"Circuit breaker {self.name} opened after "
+                        f"{self.failures} consecutive failures"
+                    )
+                self.state = BREAKER_OPEN
+                self._opened_at = time.monotonic()
+
+    def snapshot(self):
+        with self._lock:
+            retry_in = None
+            if self.state == BREAKER_OPEN:
+                retry_in = max(
+                    0, round(self.cooldown - (time.monotonic() - self._opened_at), 1)
+                )
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "trips": self.trips,
+                "retry_in_seconds": retry_in,
+            }
@@ -0,0 +1,160 @@
+from datetime import datetime
+import hashlib
+import json
+import logging
+import os
+import threading
+from models import FilingHistory
+from extensions import db
+from utils.export import (
+    fill_pdf_annotations,
+    fill_pdf_bytes,
+    template_version,
+    MCS150_TEMPLATE,
+)
+from utils.notification import add_notifications
+from utils.previews import schedule_preview
+from utils.storage import generated_file_path, new_generated_path
+
+logger = logging.getLogger(__name__)
+
+
+def filing_content_hash(form_data, template=MCS150_TEMPLATE, fill_mode=None):
+    canonical = json.dumps(
+        form_data, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+    digest = hashlib.sha256(template_version(template, fill_mode).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(canonical.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def find_generated_filing(content_hash):
+    """Return the name of an already generated PDF for this content, if any."""
+    filing_histories = (
+        FilingHistory.query.with_entities(FilingHistory.filingPath)
+        .filter_by(contentHash=content_hash, status=1)
+        .order_by(FilingHistory.id.desc())
+        .limit(5)
+    )
+    for filing_history in filing_histories:
+        if filing_history.filingPath and os.path.exists(
+            generated_file_path(filing_history.filingPath)
+        ):
+            return filing_history.filingPath
+    return None
+
+
+def build_filing_history(form_data, user_id, filing_name, content_hash=None):
+    filing_history = FilingHistory()
+    filing_history.usdotNumber = form_data.get("line16_19", {}).get("line16", "")
+    filing_history.carrierEin = form_data.get("line16_19", {}).get("line19", "")
+    filing_history.carrierEmail = form_data.get("line20", "")
+    filing_history.carrierMileage = form_data.get("line21", "")
+    filing_history.userId = user_id
+    filing_history.filingPath = filing_name
+    filing_history.contentHash = content_hash
+    filing_history.status = 1
+    return filing_history
+
+
+def _new_filing_name(form_data):
+    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+    return f'USDOT_{form_data.get("line16_19", {}).get("line16", "")}_{timestamp}.pdf'
+
+
+def _record_filing(form_data, decoded, filing_name, content_hash, persisted=True):
+    if not decoded:
+        return
+    db.session.add(
+        build_filing_history(
+            form_data,
+            decoded.get("sub", ""),
+            filing_name if persisted else None,
+            content_hash if persisted else None,
+        )
+    )
+    db.session.commit()
+
+    if persisted:
+        document = filing_name
+    else:
+        # nothing was written, so there is no file to name
+        usdot_number = form_data.get("line16_19", {}).get("line16", "")
+        document = f"A PDF for USDOT {usdot_number}"
+    add_notifications(
+        {
+            "type": "document",
+            "title": "PDF Generation Complete",
+            "description": f"{document} has been generated by {decoded.get('firstName', '')}",
+            "read": False,
+            "link": "/admin/notifications",
+        },
+        decoded.get("sub", ""),
+    )
+
+
+def generate_filing(form_data, decoded, fill_mode=None):
+    """Fill the MCS-150, record it in FilingHistory and notify the admins.
+
+    An identical payload against the same template reuses the PDF generated
+    the first time; every call still gets its own FilingHistory row.
+    Returns (result, filing_name) where result is "Success" or "Failed".
+    """
+    content_hash = filing_content_hash(form_data, fill_mode=fill_mode)
+    filing_name = find_generated_filing(content_hash)
+    if filing_name:
+        result = "Success"
+    else:
+        filing_name = _new_filing_name(form_data)
+        result = fill_pdf_annotations(
+            MCS150_TEMPLATE, new_generated_path(filing_name), form_data, fill_mode
+        )
+        if result == "Success":
+            schedule_preview(filing_name)
+
+    _record_filing(
+        form_data, decoded, filing_name, content_hash if result == "Success" else None
+    )
+    return result, filing_name
+
+
+def _write_generated_file(filing_name, pdf_bytes):
+    try:
+        path = new_generated_path(filing_name)
+        # write-then-rename so readers never see a partial PDF
+        with open(f"{path}.tmp", "wb") as pdf_file:
+            pdf_file.write(pdf_bytes)
+        os.replace(f"{path}.tmp", path)
+        schedule_preview(filing_name)
+    except OSError as exception:
+        logger.error(f"Could not persist {filing_name}: {exception}", exc_info=True)
+
+
+def generate_filing_bytes(form_data, decoded, persist=True, fill_mode=None):
+    """Like generate_filing, but returns (pdf_bytes, filing_name) for inline use.
+
+    With persist the PDF is written to generated/ on a background thread;
+    without it nothing touches the disk and the history row has no path,
+    unless an identical PDF already exists there.
+    pdf_bytes is None when the fill failed.
+    """
+    content_hash = filing_content_hash(form_data, fill_mode=fill_mode)
+    filing_name = find_generated_filing(content_hash)
+    if filing_name:
+        with open(generated_file_path(filing_name), "rb") as pdf_file:
+            pdf_bytes = pdf_file.read()
+        persist = True
+    else:
+        filing_name = _new_filing_name(form_data)
+        pdf_bytes = fill_pdf_bytes(MCS150_TEMPLATE, form_data, fill_mode)
+        if pdf_bytes is not None and persist:
+            threading.Thread(
+                target=_write_generated_file,
+                args=(filing_name, pdf_bytes),
+                daemon=True,
+            ).start()
+
+    if pdf_bytes is not None:
+        _record_filing(form_data, decoded, filing_name, content_hash, persist)
+    return pdf_bytes, filing_name
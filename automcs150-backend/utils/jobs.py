@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+import json
+import logging
+import os
+from models import PdfJob
+from extensions import db
+from utils.filing import generate_filing
+
+logger = logging.getLogger(__name__)
+
+PDF_JOB_MAX_ATTEMPTS = int(os.getenv("PDF_JOB_MAX_ATTEMPTS", 3))
+
+
+def enqueue_pdf_job(form_data, decoded, fill_mode=None):
+    job = PdfJob(
+        userId=decoded.get("sub", ""),
+        status="queued",
+        payload=json.dumps(form_data),
+        claims=json.dumps(decoded),
+        fillMode=fill_mode,
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def claim_next_job():
+    """Atomically move the oldest queued job to running and return it.
+
+    FOR UPDATE SKIP LOCKED lets several workers poll the same table without
+    blocking on or double-claiming a row; SQLite ignores the clause, which
+    is fine for the single-writer case it is used for.
+    """
+    job = (
+        PdfJob.query.filter_by(status="queued")
+        .order_by(PdfJob.id)
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if job is None:
+        db.session.rollback()
+        return None
+    job.status = "running"
+    job.started_at = datetime.utcnow()
+    job.attempts += 1
+    db.session.commit()
+    return job
+
+
+def run_job(job):
+    try:
+        result, filing_name = generate_filing(
+            json.loads(job.payload), json.loads(job.claims or "{}"), job.fillMode
+        )
+        job.filingName = filing_name
+        job.status = "done" if result == "Success" else "failed"
+        if result != "Success":
+            job.error = "Failed"
+    except Exception as exception:
+        logger.error(f"PDF job {job.id} failed: {exception}", exc_info=True)
+        db.session.rollback()
+        job.status = "failed"
+        job.error = str(exception)[:255]
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+    return job
+
+
+def requeue_stale_jobs(timeout_seconds, max_attempts=PDF_JOB_MAX_ATTEMPTS):
+    """Put jobs that have been running longer than the timeout back in the queue.
+
+    A job whose worker died max_attempts times is failed instead, so one
+    that crashes the worker cannot keep taking it down.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=timeout_seconds)
+    stale = PdfJob.query.filter(PdfJob.status == "running", PdfJob.started_at < cutoff)
+    failed = stale.filter(PdfJob.attempts >= max_attempts).update(
+        {
+            "status": "failed",
+            "error": f"Worker stopped during all {max_attempts} attempts",
+            "finished_at": datetime.utcnow(),
+        }
+    )
+    count = stale.filter(PdfJob.attempts < max_attempts).update(
+        {"status": "queued", "started_at": None}
+    )
+    db.session.commit()
+    if failed:
+        logger.warning(f"Failed {failed} PDF jobs after {max_attempts} attempts")
+    return count
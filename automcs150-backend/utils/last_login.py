@@ -0,0 +1,130 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from flask import current_app
+from sqlalchemy import bindparam, or_, text
+from extensions import db
+from models import User
+
+logger = logging.getLogger(__name__)
+
+LAST_LOGIN_FLUSH_INTERVAL = float(os.getenv("LAST_LOGIN_FLUSH_INTERVAL", 5))
+
+# user id -> newest login time not yet written
+_pending = {}
+_pending_lock = threading.Lock()
+_flusher = None
+_app = None
+
+
+def record_last_login(user_id, logged_in_at):
+    """Buffer a login time; the flusher thread writes it within
+    LAST_LOGIN_FLUSH_INTERVAL seconds.
+
+    The buffer is per process. Readers of User.lastLogin in other gunicorn
+    workers see the time only after this worker's flush, so lastLogin is
+    up to LAST_LOGIN_FLUSH_INTERVAL seconds stale (more if a write fails
+    and is retried). A worker flushes what is left when it exits.
+    """
+    global _app
+    with _pending_lock:
+        if user_id not in _pending or _pending[user_id] < logged_in_at:
+            _pending[user_id] = logged_in_at
+        if _app is None:
+            _app = current_app._get_current_object()
+    _start_flusher()
+
+
+def _start_flusher():
+    global _flusher
+    if _flusher is not None:
+        return
+    with _pending_lock:
+        if _flusher is None:
+            _flusher = threading.Thread(
+                target=_flush_periodically, name="last-login", daemon=True
+            )
+            _flusher.start()
+
+
+def _flush_periodically():
+    while True:
+        time.sleep(LAST_LOGIN_FLUSH_INTERVAL)
+        flush_last_logins()
+
+
+def _update_postgres(connection, logins):
+    values = ", ".join(
+        f"(CAST(:id{index} AS integer), CAST(:at{index} AS timestamp))"
+        for index in range(len(logins))
+    )
+    params = {}
+    for index, (user_id, logged_in_at) in enumerate(logins.items()):
+        params[f"id{index}"] = user_id
+        params[f"at{index}"] = logged_in_at
+    connection.execute(
+        text(
+            'UPDATE "User" SET "lastLogin" = logins.logged_in_at '
+            f"FROM (VALUES {values}) AS logins (id, logged_in_at) "
+            'WHERE "User".id = logins.id '
+            'AND ("User"."lastLogin" IS NULL OR "User"."lastLogin" < logins.logged_in_at)'
+        ),
+        params,
+    )
+
+
+def _update_executemany(connection, logins):
+    connection.execute(
+        User.__table__.update()
+        .where(User.id == bindparam("user_id"))
+        .where(or_(User.lastLogin.is_(None), User.lastLogin < bindparam("logged_in_at")))
+        .values(lastLogin=bindparam("logged_in_at")),
+        [
+            {"user_id": user_id, "logged_in_at": logged_in_at}
+            for user_id, logged_in_at in logins.items()
+        ],
+    )
+
+
+def flush_last_logins():
+    """Write the buffered login times in one statement and one commit.
+
+    A failed write puts the times back for the next flush. Newer times are
+    never overwritten by older ones, whichever worker flushes first.
+    """
+    global _pending
+    with _pending_lock:
+        logins, _pending = _pending, {}
+        app = _app
+    if not logins:
+        return 0
+    try:
+        with app.app_context(), db.engine.begin() as connection:
+            if connection.dialect.name == "postgresql":
+                _update_postgres(connection, logins)
+            else:
+                _update_executemany(connection, logins)
+    except Exception as exception:
+        logger.warning(f"Could not write {len(logins)} last login times: {exception}")
+        with _pending_lock:
+            for user_id, logged_in_at in logins.items():
+                if user_id not in _pending or _pending[user_id] < logged_in_at:
+                    _pending[user_id] = logged_in_at
+        return 0
+    return len(logins)
+
+
+def _reset_after_fork():
+    # the parent's flusher thread and buffered logins stay with the parent
+    global _pending_lock, _pending, _flusher
+    _pending_lock = threading.Lock()
+    _pending = {}
+    _flusher = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+atexit.register(flush_last_logins)
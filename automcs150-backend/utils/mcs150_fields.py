@@ -0,0 +1,347 @@
+from collections import namedtuple
+
+# Widget kinds understood by the fill engine.
+TEXT = "text"
+CHECKBOX_VALUE = "checkbox_value"  # checked when the payload value == match
+CHECKBOX_SUBSTRING = "checkbox_substring"  # checked when any match is `in` the payload
+RADIO_RECT = "radio_rect"  # one widget per rect, checked when the payload == rect's value
+INSERT_TEXT = "insert_text"  # template has no usable widget, add a new one at rect
+
+FieldSpec = namedtuple(
+    "FieldSpec",
+    ["name", "kind", "path", "match", "transform", "hidden", "rect", "target"],
+    defaults=[None, None, False, None, None],
+)
+
+
+def _has_text(value):
+    return bool(len(value))
+
+
+_MAILING_SAME_RECT = (201.0, 444.75, 210.0, 453.75)
+_MAILING_DIFFERENT_RECT = (309.0, 444.75, 318.0, 453.75)
+
+# (widget suffix, payload key suffix) for the line 26a fleet table. The payload
+# keys are prefixed with "own"/"trm"/"trp" except for the hazmat rows.
+_FLEET_ROWS = [
+    ("straight", "truck"),
+    ("tractor", "tract"),
+    ("trailer", "trail"),
+    ("haztruck", None),
+    ("haztrail", None),
+    ("coach", "coach"),
+    ("school1-8", "school_1_8"),
+    ("school9-15", "school_9_15"),
+    ("school16+", "school_16"),
+    ("bus16+", "bus_16"),
+    ("van1-8", "van_1_8"),
+    ("van9-15", "van_9_15"),
+    ("limo1-8", "limo_1_8"),
+    ("limo9-15", "limo_9_15"),
+    ("limo16+", "limo_16"),
+]
+_FLEET_COLUMNS = [("Own", "own", "own"), ("Term", "trm", "term"), ("Trip", "trp", "trip")]
+
+_LINE22_BOXES = ["A", "B", "C", "D", "E"]
+
+_LINE23_BOXES = [
+    ("23aBox", "Auth. For Hire"),
+    ("23bBox", "Exempt For Hire"),
+    ("23cBox", "Private(Property)"),
+    ("23dBox", "Priv. Pass. (Business)"),
+    ("23eBox", "Priv. Pass.(Non-business)"),
+    ("23fBox", "Migrant"),
+    ("23gBox", "U.S. Mail"),
+    ("23hBox", "Fed. Gov't"),
+    ("23iBox", "State Gov't"),
+    ("23jBox", "Local Gov't"),
+    ("23kBox", "Indian Nation"),
+]
+
+_LINE24_BOXES = [
+    ("24aBox", "General Freight"),
+    ("24bBox", "Household Goods"),
+    ("24cBox", "Metal: sheets, coils, rolls"),
+    ("24dBox", "Motor Vehicles"),
+    ("24eBox", "Drive/Tow away"),
+    ("24fBox", "Logs, Poles, Beams, Lumber"),
+    ("24gBox", "Building Materials"),
+    ("24hBox", "Mobile Homes"),
+    ("24iBox", "Machinery, Large Objects"),
+    ("24jBox", "Fresh Produce"),
+    ("24kBox", "Liquids/Gases"),
+    ("24lBox", "Intermodal Cont."),
+    ("24mBox", "Passengers"),
+    ("24nBox", "Oilfield Equipment"),
+    ("24oBox", "Livestock"),
+    ("24pBox", "Grain, Feed, Hay"),
+    ("24qBox", "Coal/Coke"),
+    ("24rBox", "Meat"),
+    ("24sBox", "Garbage/Refuse"),
+    ("24tBox", "US Mail"),
+    ("24uBox", "Chemicals"),
+    ("24vBox", "Commodities Dry Bulk"),
+    ("24wBox", "Refrigerated Food"),
+    ("24xBox", "Beverages"),
+    ("24yBox", "Paper Products"),
+    ("24zBox", "Utilities"),
+    ("24aaBox", "Agricultural/Farm Supplies"),
+    ("24bbBox", "Construction"),
+    ("24ccBox", "Water Well"),
+]
+
+_VEHICLE_CARGO = ("Motor Vehicles", "Drive/Tow away")
+
+
+def _build_spec():
+    spec = [
+        FieldSpec("1bizName", TEXT, ("line1",)),
+        FieldSpec("2dbaName", TEXT, ("line2",)),
+        FieldSpec("3principalStreet", TEXT, ("line3_7", "line3")),
+        FieldSpec("4principalCity", TEXT, ("line3_7", "line4")),
+        FieldSpec("5principalState", TEXT, ("line3_7", "line5")),
+        FieldSpec("6principalZip", TEXT, ("line3_7", "line6")),
+        FieldSpec("7principalColonia", TEXT, ("line3_7", "line7")),
+        FieldSpec(
+            "Mailing Button",
+            RADIO_RECT,
+            ("line8_12", "isSame"),
+            match={_MAILING_SAME_RECT: True, _MAILING_DIFFERENT_RECT: False},
+        ),
+        FieldSpec("8mailStreet", TEXT, ("line8_12", "line8"), hidden=True),
+        FieldSpec("9mailCity", TEXT, ("line8_12", "line9"), hidden=True),
+        FieldSpec("10mailState", TEXT, ("line8_12", "line10"), hidden=True),
+        FieldSpec("11mailZip", TEXT, ("line8_12", "line11"), hidden=True),
+        FieldSpec("12mailColonia", TEXT, ("line8_12", "line12"), hidden=True),
+        FieldSpec("13bizPhone", TEXT, ("line13_15", "line13")),
+        FieldSpec("14cellPhone", TEXT, ("line13_15", "line14")),
+        FieldSpec("15faxNumber", TEXT, ("line13_15", "line15")),
+        FieldSpec("16usdotNumber", TEXT, ("line16_19", "line16")),
+        FieldSpec("17mcmxNumber", TEXT, ("line16_19", "line17")),
+        FieldSpec("18dunbradNumber", TEXT, ("line16_19", "line18")),
+        FieldSpec("19irsNumber", TEXT, ("line16_19", "line19")),
+        FieldSpec("20eMail", TEXT, ("line20",)),
+        FieldSpec("21carrierMileage", TEXT, ("line21",)),
+    ]
+    spec += [
+        FieldSpec(f"22{letter.lower()}Box", CHECKBOX_VALUE, ("line22",), match=letter)
+        for letter in _LINE22_BOXES
+    ]
+    spec += [
+        FieldSpec(name, CHECKBOX_SUBSTRING, ("line23",), match=(label,))
+        for name, label in _LINE23_BOXES
+    ]
+    spec += [
+        FieldSpec(name, CHECKBOX_SUBSTRING, ("line24",), match=(label,))
+        for name, label in _LINE24_BOXES
+    ]
+    spec += [
+        FieldSpec(
+            "24ddBox",
+            CHECKBOX_VALUE,
+            ("line24_other",),
+            match=True,
+            transform=_has_text,
+        ),
+        FieldSpec(
+            "24ddDescribe",
+            INSERT_TEXT,
+            ("line24_other",),
+            rect=(484.0, 244.25, 591.0, 265.25),
+            target="24ddOther",
+        ),
+        FieldSpec("25ggCBox", CHECKBOX_SUBSTRING, ("line24",), match=_VEHICLE_CARGO),
+        FieldSpec("25ggNBBox", CHECKBOX_SUBSTRING, ("line24",), match=_VEHICLE_CARGO),
+    ]
+    for column, prefix, haz_prefix in _FLEET_COLUMNS:
+        for row, key in _FLEET_ROWS:
+            if key is None:
+                payload_key = f"{haz_prefix}_haz_{row[3:]}"
+            else:
+                payload_key = f"{prefix}{key}"
+            spec.append(FieldSpec(f"{row}{column}", TEXT, ("line26a", payload_key)))
+    spec += [
+        FieldSpec("interWithin", TEXT, ("line27", "interstate_within_100_miles")),
+        FieldSpec("intraWithin", TEXT, ("line27", "intrastate_within_100_miles")),
+        FieldSpec("interBeyond", TEXT, ("line27", "interstate_beyond_100_miles")),
+        FieldSpec("intraBeyond", TEXT, ("line27", "intrastate_beyond_100_miles")),
+        FieldSpec(
+            "totalDrivers",
+            INSERT_TEXT,
+            ("line27", "total_drivers"),
+            rect=(406.0, 101.54302978515625, 494.0, 113.54302978515625),
+            target="_totalDrivers",
+        ),
+        FieldSpec(
+            "totalCDL",
+            INSERT_TEXT,
+            ("line27", "total_cdl"),
+            rect=(502.0, 101.54302978515625, 590.0, 113.54302978515625),
+            target="_totalCDL",
+        ),
+    ]
+    return spec
+
+
+MCS150_FIELDS = _build_spec()
+
+
+def _getter(path):
+    if len(path) == 1:
+        (key,) = path
+        return lambda form_data: form_data.get(key, "")
+    section, key = path
+    return lambda form_data: form_data.get(section, {}).get(key, "")
+
+
+# Fill modes. "appearance" regenerates each widget's appearance stream as it
+# is filled; "fast" only writes the field values and sets NeedAppearances so
+# the viewer draws them; "flatten" fills like "appearance" and then bakes
+# the widgets into page content, leaving a non-editable copy.
+FILL_APPEARANCE = "appearance"
+FILL_FAST = "fast"
+FILL_FLATTEN = "flatten"
+FILL_MODES = (FILL_APPEARANCE, FILL_FAST, FILL_FLATTEN)
+
+# Annotation flags (PDF 32000-1, 12.5.3)
+_ANNOT_HIDDEN = 2
+_ANNOT_PRINT = 4
+_ANNOT_NOVIEW = 32
+
+
+class AppearanceWriter:
+    """Sets values through the widget API, regenerating appearances."""
+
+    @staticmethod
+    def set_text(page, field, value, hidden):
+        if hidden:
+            field.field_display = False
+        field.field_value = value
+        field.update()
+
+    @staticmethod
+    def check(page, field):
+        field.field_value = 1
+        field.update()
+
+
+class DirectValueWriter:
+    """Writes /V (and /AS) straight into the PDF objects, without appearances.
+
+    Only valid together with doc.need_appearances(True).
+    """
+
+    @staticmethod
+    def _field_xref(doc, field):
+        # kids of a radio group carry /AS, the value lives on the parent
+        if doc.xref_get_key(field.xref, "T")[0] == "null":
+            parent = doc.xref_get_key(field.xref, "Parent")
+            if parent[0] == "xref":
+                return int(parent[1].split()[0])
+        return field.xref
+
+    @staticmethod
+    def set_text(page, field, value, hidden):
+        doc = page.parent
+        if hidden:
+            # matches field_display = False (0, i.e. visible) in AppearanceWriter
+            flags_type, flags = doc.xref_get_key(field.xref, "F")
+            flags = int(flags) if flags_type == "int" else 0
+            flags = (flags & ~(_ANNOT_HIDDEN | _ANNOT_NOVIEW)) | _ANNOT_PRINT
+            doc.xref_set_key(field.xref, "F", str(flags))
+        import fitz  # PyMuPDF
+
+        text = "" if value is None else str(value)
+        doc.xref_set_key(
+            DirectValueWriter._field_xref(doc, field), "V", fitz.get_pdf_str(text)
+        )
+
+    @staticmethod
+    def check(page, field):
+        doc = page.parent
+        on_state = field.on_state() or "Yes"
+        doc.xref_set_key(
+            DirectValueWriter._field_xref(doc, field), "V", f"/{on_state}"
+        )
+        doc.xref_set_key(field.xref, "AS", f"/{on_state}")
+
+
+def _compile_field(spec, writer):
+    get = _getter(spec.path)
+    transform = spec.transform
+    set_text = writer.set_text
+    check = writer.check
+
+    if spec.kind == TEXT:
+        hidden = spec.hidden
+
+        def fill(page, field, form_data):
+            value = get(form_data)
+            if transform:
+                value = transform(value)
+            set_text(page, field, value, hidden)
+
+    elif spec.kind == CHECKBOX_VALUE:
+        match = spec.match
+
+        def fill(page, field, form_data):
+            value = get(form_data)
+            if transform:
+                value = transform(value)
+            if value == match:
+                check(page, field)
+
+    elif spec.kind == CHECKBOX_SUBSTRING:
+        labels = spec.match
+
+        def fill(page, field, form_data):
+            value = get(form_data)
+            if any(label in value for label in labels):
+                check(page, field)
+
+    elif spec.kind == RADIO_RECT:
+        rects = spec.match
+
+        def fill(page, field, form_data):
+            rect = tuple(field.rect)
+            if rect in rects and get(form_data) == rects[rect]:
+                check(page, field)
+
+    elif spec.kind == INSERT_TEXT:
+        rect = spec.rect
+        target = spec.target
+
+        # add_widget always builds an appearance; there are only a few of these
+        def fill(page, field, form_data):
+            import fitz  # PyMuPDF
+
+            widget = fitz.Widget()
+            widget.rect = fitz.Rect(rect)
+            widget.field_name = target
+            widget.text_font = field.text_font
+            widget.text_fontsize = field.text_fontsize
+            widget.field_value = get(form_data)
+            widget.field_type = field.field_type
+            page.add_widget(widget)
+
+    else:
+        raise ValueError(f"Unknown field kind {spec.kind!r} for {spec.name!r}")
+
+    return fill
+
+
+def compile_field_plan(spec, writer=AppearanceWriter):
+    """Compile a field spec into a {widget name: fill(page, field, form_data)} map."""
+    plan = {}
+    for entry in spec:
+        if entry.name in plan:
+            raise ValueError(f"Duplicate field spec for {entry.name!r}")
+        plan[entry.name] = _compile_field(entry, writer)
+    return plan
+
+
+MCS150_FIELD_PLANS = {
+    FILL_APPEARANCE: compile_field_plan(MCS150_FIELDS, AppearanceWriter),
+    FILL_FAST: compile_field_plan(MCS150_FIELDS, DirectValueWriter),
+}
+MCS150_FIELD_PLANS[FILL_FLATTEN] = MCS150_FIELD_PLANS[FILL_APPEARANCE]
@@ -0,0 +1,107 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
+import bcrypt
+
+# bcrypt cost; raising it upgrades each stored hash at its owner's next login
+BCRYPT_LOG_ROUNDS = int(os.getenv("BCRYPT_LOG_ROUNDS", 12))
+PASSWORD_HASH_THREADS = int(os.getenv("PASSWORD_HASH_THREADS", 2))
+# hashes allowed to wait for a thread before new ones are turned away
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", 8))
+
+
+class PasswordHasherBusy(RuntimeError):
+    """Raised when the hashing queue is full; the caller should retry later."""
+
+
+_pool = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_THREADS, thread_name_prefix="bcrypt"
+)
+_slots = threading.BoundedSemaphore(PASSWORD_HASH_THREADS + PASSWORD_HASH_QUEUE)
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def _release(future):
+    _slots.release()
+
+
+def _run(function, *args):
+    """Run a bcrypt call on the hashing pool and wait for its result.
+
+    bcrypt releases the GIL, so the request threads of this worker keep
+    serving other endpoints meanwhile; at most PASSWORD_HASH_THREADS hashes
+    burn CPU at once however many logins arrive.
+    """
+    if not _slots.acquire(blocking=False):
+        _count("rejected")
+        raise PasswordHasherBusy("Too many password checks in progress")
+    try:
+        future = _pool.submit(function, *args)
+    except BaseException:
+        _slots.release()
+        raise
+    future.add_done_callback(_release)
+    _count("submitted")
+    return future.result()
+
+
+def _hash(password):
+    return bcrypt.hashpw(
+        password.encode("utf-8"), bcrypt.gensalt(BCRYPT_LOG_ROUNDS)
+    ).decode("utf-8")
+
+
+def _check(password_hash, password):
+    try:
+        return bcrypt.checkpw(password.encode("utf-8"), password_hash.encode("utf-8"))
+    except ValueError:
+        # not a bcrypt hash
+        return False
+
+
+def hash_password(password):
+    """Return the bcrypt hash of password at the configured cost."""
+    return _run(_hash, password)
+
+
+def verify_password(password_hash, password):
+    if not password_hash or not password:
+        return False
+    return _run(_check, password_hash, password)
+
+
+def needs_rehash(password_hash):
+    """Whether password_hash was made at a lower cost than is configured."""
+    try:
+        return int(password_hash.split("$")[2]) < BCRYPT_LOG_ROUNDS
+    except (AttributeError, IndexError, ValueError):
+        return True
+
+
+def password_hash_stats():
+    """Hashing pool counters for this worker process."""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats.setdefault("submitted", 0)
+    stats.setdefault("rejected", 0)
+    stats["log_rounds"] = BCRYPT_LOG_ROUNDS
+    stats["threads"] = PASSWORD_HASH_THREADS
+    stats["queue_limit"] = PASSWORD_HASH_QUEUE
+    return stats
+
+
+def _reset_after_fork():
+    global _stats_lock, _slots
+    _stats_lock = threading.Lock()
+    _slots = threading.BoundedSemaphore(PASSWORD_HASH_THREADS + PASSWORD_HASH_QUEUE)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,149 @@
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import logging
+import os
+import threading
+from utils.storage import generated_file_path
+from utils.template_cache import fitz_lock
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_DIR = os.getenv("PREVIEW_DIR", "previews")
+PREVIEW_MAX_BYTES = int(os.getenv("PREVIEW_MAX_BYTES", 256 * 1024 * 1024))
+PREVIEW_DEFAULT_DPI = 50
+# the preview route is public; requested DPIs snap to these so a caller
+# cannot make every DPI a separate render and cache entry
+PREVIEW_DPIS = (30, 50, 75, 100, 150)
+
+_file_hashes = {}
+_evict_lock = threading.Lock()
+# this process's running estimate of PREVIEW_DIR's size; None until scanned
+_cache_bytes = None
+_background = ThreadPoolExecutor(max_workers=1)
+
+
+def _file_hash(path):
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    digest = _file_hashes.get(key)
+    if digest is None:
+        sha256 = hashlib.sha256()
+        with open(path, "rb") as pdf_file:
+            for chunk in iter(lambda: pdf_file.read(1024 * 1024), b""):
+                sha256.update(chunk)
+        digest = sha256.hexdigest()
+        if len(_file_hashes) >= 10000:
+            _file_hashes.clear()
+        _file_hashes[key] = digest
+    return digest
+
+
+def preview_dpi(dpi):
+    """The smallest rendered DPI at least as sharp as dpi (capped at the largest)."""
+    return next((bucket for bucket in PREVIEW_DPIS if bucket >= dpi), PREVIEW_DPIS[-1])
+
+
+def _scan():
+    entries = []
+    for entry in os.scandir(PREVIEW_DIR):
+        if entry.name.endswith(".png"):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    return entries
+
+
+def _evict(new_path):
+    """Count a new preview and delete the least recently used other ones
+    once the cache is over PREVIEW_MAX_BYTES.
+
+    The directory is only listed on first use and when the running total
+    says the cache is full; the listing then corrects the total for what
+    other workers wrote.
+    """
+    global _cache_bytes
+    with _evict_lock:
+        if _cache_bytes is None:
+            _cache_bytes = sum(size for _, size, _ in _scan())
+        else:
+            _cache_bytes += os.path.getsize(new_path)
+        if _cache_bytes <= PREVIEW_MAX_BYTES:
+            return
+        entries = _scan()
+        _cache_bytes = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if _cache_bytes <= PREVIEW_MAX_BYTES:
+                return
+            if path == new_path:
+                # the caller is about to send it
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            _cache_bytes -= size
+
+
+def get_preview(filing_name, page_number=1, dpi=PREVIEW_DEFAULT_DPI):
+    """Return the path of a PNG of one page of a generated filing.
+
+    Renders are cached on disk keyed by the PDF's content hash, page and
+    DPI (snapped to PREVIEW_DPIS), and evicted least-recently-used once
+    PREVIEW_MAX_BYTES is exceeded.
+    Raises FileNotFoundError for an unknown filing and IndexError for a page
+    outside the document.
+    """
+    dpi = preview_dpi(dpi)
+    pdf_path = generated_file_path(filing_name)
+    preview_path = os.path.join(
+        PREVIEW_DIR, f"{_file_hash(pdf_path)}_{page_number}_{dpi}.png"
+    )
+    if os.path.exists(preview_path):
+        # touch, so eviction sees it as recently used
+        os.utime(preview_path)
+        return preview_path
+
+    import fitz  # PyMuPDF
+
+    with fitz_lock():
+        doc = fitz.open(pdf_path)
+        try:
+            if not 1 <= page_number <= doc.page_count:
+                raise IndexError(f"Page {page_number} out of range 1-{doc.page_count}")
+            page = doc[page_number - 1]
+            if doc.need_appearances():
+                # fill_mode=fast leaves appearances to the viewer, and MuPDF's
+                # renderer would show those fields blank; build them in memory
+                for widget in page.widgets():
+                    widget.update()
+            pixmap = page.get_pixmap(dpi=dpi, alpha=False)
+            os.makedirs(PREVIEW_DIR, exist_ok=True)
+            # write-then-rename so concurrent readers never get a partial PNG
+            temp_path = f"{preview_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            pixmap.save(temp_path, output="png")
+            os.replace(temp_path, preview_path)
+        finally:
+            doc.close()
+    _evict(preview_path)
+    return preview_path
+
+
+def _render_in_background(filing_name):
+    try:
+        get_preview(filing_name)
+    except Exception as exception:
+        logger.warning(f"Could not render preview for {filing_name}: {exception}")
+
+
+def schedule_preview(filing_name):
+    """Render the first-page thumbnail of a new filing off the request thread."""
+    _background.submit(_render_in_background, filing_name)
+
+
+def _reset_after_fork():
+    global _evict_lock, _cache_bytes
+    _evict_lock = threading.Lock()
+    _cache_bytes = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
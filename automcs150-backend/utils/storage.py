@@ -0,0 +1,131 @@
+from datetime import datetime, timedelta
+import hashlib
+import logging
+import os
+import shutil
+from extensions import db
+from models import FilingHistory
+
+logger = logging.getLogger(__name__)
+
+GENERATED_DIR = os.getenv("GENERATED_DIR", "generated")
+GENERATED_RETENTION_DAYS = int(os.getenv("GENERATED_RETENTION_DAYS", 365))
+# a file is written before its FilingHistory row commits (and inline filings
+# are written from a background thread), so young orphans are left alone
+GENERATED_ORPHAN_GRACE_MINUTES = int(os.getenv("GENERATED_ORPHAN_GRACE_MINUTES", 60))
+
+
+def _shard(filing_name):
+    digest = hashlib.sha1(filing_name.encode("utf-8")).hexdigest()
+    return os.path.join(digest[:2], digest[2:4])
+
+
+def generated_file_path(filing_name):
+    """Where a generated PDF lives on disk.
+
+    Files are sharded into generated/ab/cd/<name> by a hash of the name, so
+    no directory grows past a few hundred entries. Filings written before
+    sharding are still found at the flat generated/<name> location.
+    """
+    path = os.path.join(GENERATED_DIR, _shard(filing_name), filing_name)
+    if not os.path.exists(path):
+        legacy_path = os.path.join(GENERATED_DIR, filing_name)
+        if os.path.exists(legacy_path):
+            return legacy_path
+    return path
+
+
+def new_generated_path(filing_name):
+    directory = os.path.join(GENERATED_DIR, _shard(filing_name))
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, filing_name)
+
+
+def _iter_generated_files():
+    for root, _, names in os.walk(GENERATED_DIR):
+        for name in names:
+            if name.endswith(".pdf"):
+                yield os.path.join(root, name), name
+
+
+def _newest_references(names):
+    """Return {filing name: created_at of the newest row pointing at it}."""
+    rows = (
+        FilingHistory.query.with_entities(
+            FilingHistory.filingPath, db.func.max(FilingHistory.created_at)
+        )
+        .filter(FilingHistory.filingPath.in_(names))
+        .group_by(FilingHistory.filingPath)
+        .all()
+    )
+    return {filing_path: created_at for filing_path, created_at in rows}
+
+
+def collect_generated_files(
+    max_age_days=None,
+    unreferenced=False,
+    archive_dir=None,
+    batch_size=500,
+    dry_run=False,
+    grace_minutes=GENERATED_ORPHAN_GRACE_MINUTES,
+):
+    """Delete (or move to archive_dir) generated PDFs that are no longer needed.
+
+    A file is collected when the newest FilingHistory row pointing at it is
+    older than max_age_days (deduplicated filings keep reusing old files, so
+    the file's own mtime says nothing), or, with unreferenced, when no row
+    points at it. A file no row points at is only touched once it is
+    grace_minutes old. Files are checked against the database batch_size at
+    a time. Returns {"files": n, "bytes": reclaimed}.
+    """
+    # FilingHistory.created_at is naive UTC; file times are epoch seconds
+    row_cutoff = file_cutoff = None
+    if max_age_days is not None:
+        row_cutoff = datetime.utcnow() - timedelta(days=max_age_days)
+        file_cutoff = (datetime.now() - timedelta(days=max_age_days)).timestamp()
+    orphan_cutoff = (datetime.now() - timedelta(minutes=grace_minutes)).timestamp()
+
+    stats = {"files": 0, "bytes": 0}
+    batch = []
+
+    def flush(batch):
+        references = _newest_references([name for _, name, _ in batch])
+        for path, name, stat in batch:
+            if name in references:
+                expired = row_cutoff is not None and references[name] < row_cutoff
+                orphaned = False
+            else:
+                old_enough = stat.st_mtime < orphan_cutoff
+                expired = (
+                    old_enough and file_cutoff is not None and stat.st_mtime < file_cutoff
+                )
+                orphaned = unreferenced and old_enough
+            if not (expired or orphaned):
+                continue
+            if not dry_run:
+                try:
+                    if archive_dir:
+                        destination = os.path.join(
+                            archive_dir, os.path.relpath(path, GENERATED_DIR)
+                        )
+                        os.makedirs(os.path.dirname(destination), exist_ok=True)
+                        shutil.move(path, destination)
+                    else:
+                        os.remove(path)
+                except OSError as exception:
+                    logger.warning(f"Could not collect {path}: {exception}")
+                    continue
+            stats["files"] += 1
+            stats["bytes"] += stat.st_size
+
+    for path, name in _iter_generated_files():
+        try:
+            batch.append((path, name, os.stat(path)))
+        except FileNotFoundError:
+            continue
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+    return stats
@@ -0,0 +1,148 @@
+from collections import namedtuple
+from contextlib import contextmanager
+import hashlib
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+WidgetRef = namedtuple("WidgetRef", ["page", "xref", "rect", "type"])
+
+_fitz_lock = threading.RLock()
+
+
+@contextmanager
+def fitz_lock():
+    """Hold the process-wide PyMuPDF lock.
+
+    PyMuPDF runs MuPDF single-threaded and does not support using it from
+    several threads, which gthread workers and the preview thread would
+    otherwise do. Every open document must be used and closed under it.
+    """
+    with _fitz_lock:
+        yield
+
+
+def build_widget_index(doc):
+    """Map each widget name to the WidgetRefs (page, xref, rect, type) using it."""
+    index = {}
+    for page in doc:
+        for widget in page.widgets():
+            if not widget.field_name:
+                continue
+            index.setdefault(widget.field_name, []).append(
+                WidgetRef(
+                    page.number,
+                    widget.xref,
+                    tuple(widget.rect),
+                    widget.field_type_string,
+                )
+            )
+    return index
+
+
+class TemplateCache:
+    """Keeps a PDF template's bytes in memory and hands out fresh documents.
+
+    The file is re-read only when its mtime or size changes, and the cached
+    bytes are only swapped when the content hash actually differs. The
+    widget index is built once per template version.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entry = (None, None)  # (data, version), swapped as one
+        self._stat_key = None
+        self._index = (None, None)  # (version, index)
+
+    @property
+    def version(self):
+        return self._entry[1]
+
+    def _after_fork(self):
+        # Locks are not fork-safe; the bytes themselves are shared copy-on-write.
+        self._lock = threading.Lock()
+
+    def _reload_if_stale(self):
+        stat = os.stat(self.path)
+        stat_key = (stat.st_mtime_ns, stat.st_size)
+        if stat_key == self._stat_key:
+            return
+        with self._lock:
+            if stat_key == self._stat_key:
+                return
+            with open(self.path, "rb") as template_file:
+                data = template_file.read()
+            version = hashlib.sha256(data).hexdigest()
+            if version != self.version:
+                logger.info(f"Loaded PDF template {self.path} ({version[:12]})")
+                self._entry = (data, version)
+            self._stat_key = stat_key
+
+    def load(self):
+        self._reload_if_stale()
+        return self._entry[0]
+
+    def open(self):
+        """Return a fresh document; the caller must hold fitz_lock()."""
+        import fitz  # PyMuPDF, imported on first use to keep app start-up fast
+
+        with fitz_lock():
+            return fitz.open(stream=self.load(), filetype="pdf")
+
+    def open_indexed(self):
+        """Return a fresh document and the widget index for the same version.
+
+        The caller must hold fitz_lock() until the document is closed.
+        """
+        import fitz  # PyMuPDF
+
+        self._reload_if_stale()
+        data, version = self._entry
+        index_version, index = self._index
+        with fitz_lock():
+            doc = fitz.open(stream=data, filetype="pdf")
+            if index_version != version:
+                index = build_widget_index(doc)
+                self._index = (version, index)
+        return doc, index
+
+    def widget_index(self):
+        with fitz_lock():
+            doc, index = self.open_indexed()
+            doc.close()
+        return index
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_template_cache(path):
+    cache = _caches.get(path)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.setdefault(path, TemplateCache(path))
+    return cache
+
+
+def warm_template_cache(path):
+    """Load and index a template ahead of time, e.g. in the gunicorn master."""
+    try:
+        get_template_cache(path).widget_index()
+    except OSError as exception:
+        logger.warning(f"Could not preload PDF template {path}: {exception}")
+
+
+def _reset_after_fork():
+    global _caches_lock, _fitz_lock
+    _caches_lock = threading.Lock()
+    _fitz_lock = threading.RLock()
+    for cache in _caches.values():
+        cache._after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
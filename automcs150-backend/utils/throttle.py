@@ -0,0 +1,118 @@
+from collections import OrderedDict, deque
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+LOGIN_THROTTLE_WINDOW = float(os.getenv("LOGIN_THROTTLE_WINDOW", 15 * 60))
+LOGIN_ACCOUNT_MAX_FAILURES = int(os.getenv("LOGIN_ACCOUNT_MAX_FAILURES", 5))
+LOGIN_IP_MAX_FAILURES = int(os.getenv("LOGIN_IP_MAX_FAILURES", 20))
+LOGIN_THROTTLE_KEYS = int(os.getenv("LOGIN_THROTTLE_KEYS", 10000))
+
+
+class FailureThrottle:
+    """Counts failures per key over a sliding window.
+
+    Once a key has max_failures failures within window seconds, retry_after()
+    reports how long until the oldest of them falls out of the window. Only
+    the LOGIN_THROTTLE_KEYS most recently failing keys are tracked. State is
+    per worker process.
+    """
+
+    def __init__(self, name, max_failures, window, size=LOGIN_THROTTLE_KEYS):
+        self.name = name
+        self.max_failures = max_failures
+        self.window = window
+        self.size = size
+        self._lock = threading.Lock()
+        self._failures = OrderedDict()
+        self.blocked = 0
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+
+    def _recent(self, key, now):
+        failures = self._failures.get(key)
+        if failures is None:
+            return None
+        while failures and now - failures[0] >= self.window:
+            failures.popleft()
+        if not failures:
+            del self._failures[key]
+            return None
+        return failures
+
+    def retry_after(self, key):
+        """Seconds until key may try again, or 0 if it is not throttled."""
+        now = time.monotonic()
+        with self._lock:
+            failures = self._recent(key, now)
+            if failures is None or len(failures) < self.max_failures:
+                return 0
+            self.blocked += 1
+            return max(1, round(self.window - (now - failures[0])))
+
+    def record_failure(self, key):
+        now = time.monotonic()
+        with self._lock:
+            failures = self._recent(key, now) or deque(maxlen=self.max_failures)
+            failures.append(now)
+            self._failures[key] = failures
+            self._failures.move_to_end(key)
+            while len(self._failures) > self.size:
+                self._failures.popitem(last=False)
+            if len(failures) == self.max_failures:
+                logger.warning(f"Throttling {self.name} {key} after {len(failures)} failures")
+
+    def reset(self, key):
+        with self._lock:
+            self._failures.pop(key, None)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "tracked_keys": len(self._failures),
+                "blocked": self.blocked,
+                "max_failures": self.max_failures,
+                "window_seconds": self.window,
+            }
+
+
+account_throttle = FailureThrottle(
+    "account", LOGIN_ACCOUNT_MAX_FAILURES, LOGIN_THROTTLE_WINDOW
+)
+ip_throttle = FailureThrottle("ip", LOGIN_IP_MAX_FAILURES, LOGIN_THROTTLE_WINDOW)
+
+
+def login_retry_after(account, ip):
+    """Seconds until a login for account from ip may be tried, or 0.
+
+    Checked before the password is hashed, so a throttled guess costs no
+    bcrypt work.
+    """
+    return max(account_throttle.retry_after(account), ip_throttle.retry_after(ip))
+
+
+def record_login_failure(account, ip):
+    account_throttle.record_failure(account)
+    ip_throttle.record_failure(ip)
+
+
+def reset_login_failures(account):
+    # the IP's count stands: one good account does not vouch for the rest
+    account_throttle.reset(account)
+
+
+def login_throttle_stats():
+    return {"account": account_throttle.snapshot(), "ip": ip_throttle.snapshot()}
+
+
+def _reset_after_fork():
+    account_throttle._after_fork()
+    ip_throttle._after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
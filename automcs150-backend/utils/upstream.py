@@ -0,0 +1,94 @@
+from urllib.parse import urlsplit
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+UPSTREAM_RETRIES = int(os.getenv("UPSTREAM_RETRIES", 2))
+UPSTREAM_BACKOFF = float(os.getenv("UPSTREAM_BACKOFF", 0.25))
+UPSTREAM_POOL_SIZE = int(os.getenv("UPSTREAM_POOL_SIZE", 12))
+
+# host -> (connect, read) timeout in seconds
+UPSTREAM_TIMEOUTS = {
+    "data.transportation.gov": (3.05, 10),
+    "mobile.fmcsa.dot.gov": (3.05, 10),
+    "safer.fmcsa.dot.gov": (3.05, 15),
+}
+DEFAULT_UPSTREAM_TIMEOUT = (3.05, 10)
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def _new_session():
+    # requests is imported on first use to keep app start-up fast
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(
+        total=UPSTREAM_RETRIES,
+        status_forcelist=(429, 500, 502, 503, 504),
+        # every upstream POST we make (SAFER's snapshot form) is a read
+        allowed_methods=frozenset({"GET", "HEAD", "POST"}),
+        backoff_factor=UPSTREAM_BACKOFF,
+        backoff_jitter=UPSTREAM_BACKOFF,
+        # a Retry-After of minutes would outlive the caller's deadline
+        respect_retry_after_header=False,
+        # hand the last response back so callers see the real status
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=1, pool_maxsize=UPSTREAM_POOL_SIZE, max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept-Encoding": "gzip, deflate"})
+    return session
+
+
+def get_session(url):
+    """Return the keep-alive session shared by every call to url's host."""
+    host = urlsplit(url).hostname
+    session = _sessions.get(host)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(host)
+            if session is None:
+                session = _sessions[host] = _new_session()
+    return session
+
+
+def upstream_request(method, url, timeout=None, **kwargs):
+    """Make a pooled, retried request to an upstream API.
+
+    The host's (connect, read) timeout applies; a shorter timeout from the
+    caller, e.g. what is left of a lookup deadline, caps the read timeout.
+    """
+    connect, read = UPSTREAM_TIMEOUTS.get(
+        urlsplit(url).hostname, DEFAULT_UPSTREAM_TIMEOUT
+    )
+    if timeout is not None:
+        connect, read = min(connect, timeout), min(read, timeout)
+    return get_session(url).request(method, url, timeout=(connect, read), **kwargs)
+
+
+def upstream_get(url, timeout=None, **kwargs):
+    return upstream_request("GET", url, timeout, **kwargs)
+
+
+def upstream_post(url, timeout=None, **kwargs):
+    return upstream_request("POST", url, timeout, **kwargs)
+
+
+def _reset_after_fork():
+    # Pooled sockets must not be shared with the parent process.
+    global _sessions_lock
+    _sessions_lock = threading.Lock()
+    _sessions.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,227 @@
+from utils.mcs150_fields import (
+    MCS150_FIELDS,
+    CHECKBOX_SUBSTRING,
+    CHECKBOX_VALUE,
+    INSERT_TEXT,
+    TEXT,
+)
+
+MAX_TEXT_LENGTH = 255
+
+
+class PayloadError(ValueError):
+    """Raised when a generate_pdf payload fails validation; errors is a list."""
+
+    def __init__(self, errors):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+# Each schema node compiles to check(value, path, errors) -> normalized value.
+# Nodes are plain tuples so the schema below reads as data.
+def Text(max_length=MAX_TEXT_LENGTH):
+    return ("text", max_length)
+
+
+def Digits(max_length):
+    return ("digits", max_length)
+
+
+def Count():
+    return ("count",)
+
+
+def Flag():
+    return ("flag",)
+
+
+def Choice(*options):
+    return ("choice", options)
+
+
+def Selection():
+    return ("selection",)
+
+
+def Section(fields):
+    return ("section", fields)
+
+
+def _compile_text(max_length):
+    def check(value, path, errors):
+        if value is None:
+            return ""
+        if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+            errors.append(f"{path}: expected a string")
+            return value
+        value = str(value).strip()
+        if len(value) > max_length:
+            errors.append(f"{path}: longer than {max_length} characters")
+        return value
+
+    return check
+
+
+def _compile_digits(max_length):
+    check_text = _compile_text(max_length)
+
+    def check(value, path, errors):
+        value = check_text(value, path, errors)
+        if isinstance(value, str) and value and not value.isdigit():
+            errors.append(f"{path}: expected digits only")
+        return value
+
+    return check
+
+
+def _compile_count():
+    def check(value, path, errors):
+        if value is None or value == "":
+            return ""
+        if isinstance(value, bool):
+            errors.append(f"{path}: expected a whole number")
+            return value
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        if isinstance(value, str):
+            text = value.strip().replace(",", "")
+            if not text:
+                return ""
+            if not text.isdigit():
+                errors.append(f"{path}: expected a whole number")
+                return value
+            value = int(text)
+        if not isinstance(value, int) or value < 0:
+            errors.append(f"{path}: expected a whole number")
+            return value
+        return str(value)
+
+    return check
+
+
+def _compile_flag():
+    def check(value, path, errors):
+        if value is None or isinstance(value, bool):
+            return value
+        errors.append(f"{path}: expected true or false")
+        return value
+
+    return check
+
+
+def _compile_choice(options):
+    options = frozenset(options)
+
+    def check(value, path, errors):
+        if value is None:
+            return ""
+        if value not in options:
+            errors.append(f"{path}: expected one of {', '.join(sorted(options))}")
+        return value
+
+    return check
+
+
+def _compile_selection():
+    def check(value, path, errors):
+        if value is None or value == "":
+            return []
+        if isinstance(value, str):
+            value = [value]
+        if not isinstance(value, list) or not all(
+            isinstance(item, str) for item in value
+        ):
+            errors.append(f"{path}: expected a list of strings")
+            return value
+        # de-duplicated and ordered, so equal selections hash the same
+        return sorted(set(value))
+
+    return check
+
+
+def _compile_section(fields):
+    checks = {key: compile_schema(node) for key, node in fields.items()}
+
+    def check(value, path, errors):
+        if value is None:
+            return {}
+        if not isinstance(value, dict):
+            errors.append(f"{path}: expected an object")
+            return value
+        normalized = dict(value)
+        for key, check_field in checks.items():
+            if key in value:
+                normalized[key] = check_field(value[key], f"{path}.{key}", errors)
+        return normalized
+
+    return check
+
+
+_COMPILERS = {
+    "text": _compile_text,
+    "digits": _compile_digits,
+    "count": _compile_count,
+    "flag": _compile_flag,
+    "choice": _compile_choice,
+    "selection": _compile_selection,
+    "section": _compile_section,
+}
+
+
+def compile_schema(node):
+    kind, *args = node
+    return _COMPILERS[kind](*args)
+
+
+def _build_schema():
+    schema = {
+        "line1": Text(),
+        "line2": Text(),
+        "line3_7": Section({f"line{n}": Text() for n in range(3, 8)}),
+        "line8_12": Section(
+            {"isSame": Flag(), **{f"line{n}": Text() for n in range(8, 13)}}
+        ),
+        "line13_15": Section({f"line{n}": Text(40) for n in range(13, 16)}),
+        "line16_19": Section(
+            {
+                "line16": Digits(12),
+                "line17": Text(40),
+                "line18": Text(40),
+                "line19": Text(40),
+            }
+        ),
+        "line20": Text(),
+        "line21": Text(40),
+        "line24_other": Text(),
+    }
+    # the remaining sections follow the field spec, so they cannot drift
+    for spec in MCS150_FIELDS:
+        if spec.kind == CHECKBOX_VALUE and spec.path == ("line22",):
+            options = schema.setdefault("line22", Choice(""))[1]
+            schema["line22"] = Choice(*options, spec.match)
+        elif spec.kind == CHECKBOX_SUBSTRING:
+            schema[spec.path[0]] = Selection()
+        elif spec.kind in (TEXT, INSERT_TEXT) and spec.path[0] in ("line26a", "line27"):
+            section = schema.setdefault(spec.path[0], Section({}))[1]
+            section[spec.path[1]] = Count()
+    return schema
+
+
+MCS150_SCHEMA = _build_schema()
+_check_payload = compile_schema(Section(MCS150_SCHEMA))
+
+
+def validate_mcs150_payload(form_data):
+    """Validate and normalize a generate_pdf payload before any PDF work.
+
+    Fleet and driver counts become strings of whole numbers, line23/line24
+    become sorted de-duplicated lists, and nulls become empty values.
+    Unknown keys are passed through. Raises PayloadError.
+    """
+    if not isinstance(form_data, dict):
+        raise PayloadError(["payload: expected an object"])
+    errors = []
+    normalized = _check_payload(form_data, "payload", errors)
+    if errors:
+        raise PayloadError(errors)
+    return normalized